@@ -5,12 +5,14 @@ import aws_cdk as cdk
 
 from my_fastapi_eks.classic.eks_classic_cluster_stack import EksClassicClusterStack
 from my_fastapi_eks.classic.eks_classic_fastapi_service_stack import EksClassicFastApiServiceStack
+from my_fastapi_eks.common.node_tuning import LATENCY
 
 app = cdk.App()
 eks_cluster_stack = EksClassicClusterStack(
     app,
     "EksClassicClusterStack",
     stack_name="EksClassicClusterStack",
+    node_tuning=LATENCY,
     tags={
         "project": "classic-eks",
         "env": "dev",
@@ -25,6 +27,11 @@ eks_cluster_stack = EksClassicClusterStack(
 #     cluster=eks_cluster_stack.eks_cluster,
 #     alb_chart=eks_cluster_stack.alb_chart,
 #     metric_server=eks_cluster_stack.metrics_server,
+#     keda_chart=eks_cluster_stack.keda_chart,
+#     priority_classes=eks_cluster_stack.priority_classes,
+#     trace_sampling=eks_cluster_stack.trace_sampling,
+#     otel_collector=eks_cluster_stack.otel_collector,
+#     node_tuning=LATENCY,
 #     tags={
 #         "project": "classic-eks",
 #         "env": "dev",
@@ -5,6 +5,7 @@ import aws_cdk as cdk
 
 from my_fastapi_eks.fargate.eks_fargate_cluster_stack import EksFargateClusterStack
 from my_fastapi_eks.fargate.eks_fargate_fastapi_service_stack import EksFargateFastApiServiceStack
+from my_fastapi_eks.common.service_dns import ServiceDnsOptions
 
 
 app = cdk.App()
@@ -27,6 +28,13 @@ fastapi_service_stack = EksFargateFastApiServiceStack(
     "EksFargateFastApiServiceStack",
     cluster=fargate_cluster_stack.eks_cluster,
     alb_chart=fargate_cluster_stack.alb_chart,
+    metric_server=fargate_cluster_stack.metrics_server,
+    keda_chart=fargate_cluster_stack.keda_chart,
+    priority_classes=fargate_cluster_stack.priority_classes,
+    log_router=fargate_cluster_stack.log_router,
+    trace_sampling=fargate_cluster_stack.trace_sampling,
+    otel_collector=fargate_cluster_stack.otel_collector,
+    dns=ServiceDnsOptions(mode="alias", load_balancer_name="fargate-eks-fastapi"),
     tags={
         "project": "fargate-eks",
         "env": "dev",
@@ -3,6 +3,7 @@ import aws_cdk as cdk
 
 from my_fastapi_eks.karpenter.cdk_eks_karpenter_stack import CdkEksKarpenterStack
 from my_fastapi_eks.karpenter.k8s_deploy_pipeline_stack import K8sDeployPipelineStack
+from my_fastapi_eks.common.node_tuning import LATENCY
 
 app = cdk.App()
 
@@ -17,6 +18,7 @@ eks_karpenter_stack = CdkEksKarpenterStack(
     "CdkEksKarpenterStack",
     stack_name="CdkEksKarpenterStack",
     codebuild_project=k8s_deploy_pipeline_stack.codebuild_project,
+    node_tuning=LATENCY,
 )
 
 app.synth()
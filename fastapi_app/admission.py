@@ -0,0 +1,131 @@
+"""Admission control: bounded concurrency, bounded queue, fast rejections.
+
+Past ``max_concurrency`` requests in flight, new requests wait in a queue of
+at most ``max_queue``, each for at most ``queue_timeout_seconds``. Beyond
+that they are rejected at once instead of adding to everyone's latency:
+
+* 429 when the queue is full: the pod is saturated, come back later
+* 503 when the deadline expires in the queue
+
+both with ``Retry-After``. The ALB retries nothing, clients and CloudFront
+see the status. ``exempt_paths`` are never queued nor shed: exact paths, or
+prefixes when they end with ``/``. Queue depth and in-flight requests are served on
+``/metrics/admission`` (JSON, for the KEDA metrics-api trigger of
+``PreScaling.queue_depth_url``) and in Prometheus text format with
+``?format=prometheus``.
+"""
+import asyncio
+import time
+
+from starlette.responses import JSONResponse
+
+
+class AdmissionControl:
+    def __init__(self, max_concurrency: int, max_queue: int, queue_timeout_seconds: float):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout_seconds = queue_timeout_seconds
+        self._slots = asyncio.Semaphore(max_concurrency)
+        self.in_flight = 0
+        self.queued = 0
+        self.rejected = {"queue_full": 0, "deadline": 0}
+
+    @property
+    def saturated(self) -> bool:
+        """No free slot: the next request queues (or is rejected)"""
+        return self._slots.locked()
+
+    async def acquire(self) -> str | None:
+        """Wait for a slot, None once acquired or the reason of the rejection"""
+        if self.saturated:
+            if self.queued >= self.max_queue:
+                self.rejected["queue_full"] += 1
+                return "queue_full"
+            self.queued += 1
+            try:
+                await asyncio.wait_for(self._slots.acquire(), self.queue_timeout_seconds)
+            except asyncio.TimeoutError:
+                self.rejected["deadline"] += 1
+                return "deadline"
+            finally:
+                self.queued -= 1
+        else:
+            await self._slots.acquire()
+        self.in_flight += 1
+        return None
+
+    async def try_acquire(self) -> bool:
+        """Take a free slot without queuing, False if there is none"""
+        if self.saturated:
+            return False
+        # Free slot: acquired without suspending, nothing can take it meanwhile
+        await self._slots.acquire()
+        self.in_flight += 1
+        return True
+
+    def release(self):
+        self.in_flight -= 1
+        self._slots.release()
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": self.in_flight,
+            "queue_depth": self.queued,
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "rejected": dict(self.rejected),
+        }
+
+    def prometheus(self) -> str:
+        lines = [
+            "# TYPE fastapi_admission_in_flight gauge",
+            f"fastapi_admission_in_flight {self.in_flight}",
+            "# TYPE fastapi_admission_queue_depth gauge",
+            f"fastapi_admission_queue_depth {self.queued}",
+            "# TYPE fastapi_admission_rejected_total counter",
+        ]
+        lines += [f'fastapi_admission_rejected_total{{reason="{reason}"}} {count}'
+                  for reason, count in self.rejected.items()]
+        return "\n".join(lines) + "\n"
+
+
+class AdmissionMiddleware:
+    """Pure ASGI middleware: no per-request task or body wrapping"""
+
+    STATUS = {"queue_full": 429, "deadline": 503}
+
+    def __init__(self, app, admission: AdmissionControl, retry_after_seconds: int = 1, exempt_paths=()):
+        self.app = app
+        self.admission = admission
+        self.retry_after_seconds = retry_after_seconds
+        self.exempt_paths = frozenset(path for path in exempt_paths if not path.endswith("/"))
+        self.exempt_prefixes = tuple(path for path in exempt_paths if path.endswith("/"))
+
+    def exempt(self, path: str) -> bool:
+        return path in self.exempt_paths or path.startswith(self.exempt_prefixes)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or self.exempt(scope["path"]):
+            await self.app(scope, receive, send)
+            return
+
+        if self.admission.saturated:
+            # Wait in the queue, traced by tracing.TracingMiddleware
+            start_ns = time.time_ns()
+            rejection = await self.admission.acquire()
+            scope["admission.queued"] = (start_ns, time.time_ns(), rejection)
+        else:
+            rejection = await self.admission.acquire()
+        if rejection:
+            response = JSONResponse(
+                {"detail": "Server overloaded, retry later", "reason": rejection},
+                status_code=self.STATUS[rejection],
+                headers={"Retry-After": str(self.retry_after_seconds), "Cache-Control": "no-store"}
+            )
+            await response(scope, receive, send)
+            return
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.admission.release()
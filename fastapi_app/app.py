@@ -1,8 +1,136 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+import json
 
-app = FastAPI()
+from anyio import to_thread
+from fastapi import FastAPI, Request, Response
 
+from admission import AdmissionControl, AdmissionMiddleware
+from batch import router as batch_router
+from logging_setup import AccessLogMiddleware, configure_logging, dropped_records, parse_sample_rates
+import offload
+from settings import settings
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # JSON logs written by a background thread, never by the request (logging_setup.py)
+    # (+ trace id of the request in its log lines)
+    log_filters = []
+    if settings.tracing:
+        from tracing import TraceIdLogFilter
+        log_filters.append(TraceIdLogFilter())
+    log_listener = configure_logging(settings, filters=log_filters)
+    # Tokens of the threadpool running the sync (`def`) endpoints and dependencies
+    to_thread.current_default_thread_limiter().total_tokens = settings.threadpool_size
+    offload.start(settings.process_pool_size)
+    # Pooled keep-alive clients of the downstream services, see clients.upstream()
+    # (httpx is only imported when there are upstreams)
+    app.state.upstreams = {}
+    if settings.upstreams:
+        from clients import open_clients
+        app.state.upstreams = open_clients(settings)
+    yield
+    if app.state.upstreams:
+        from clients import close_clients
+        await close_clients(app.state.upstreams)
+    offload.shutdown()
+    if settings.tracing:
+        from tracing import shutdown as shutdown_tracing
+        shutdown_tracing()
+    log_listener.stop()
+
+
+if settings.docs_mode not in ("live", "static", "off"):
+    raise ValueError(f"Unknown FASTAPI_DOCS_MODE {settings.docs_mode!r}, expected live, static or off")
+
+# Server spans of FastAPI itself, with our provider (tracing.py); metrics
+# and exception logs stay with CloudWatch and logging_setup.py
+telemetry = {"tracing": False, "metrics": False, "logs": False}
+if settings.tracing:
+    import tracing
+    telemetry.update(
+        tracing=True,
+        tracer_provider=tracing.start(settings),
+        exclude=tracing.exclude_paths(settings.trace_exclude_paths)
+    )
+
+docs_enabled = settings.docs_mode != "off"
+app = FastAPI(
+    lifespan=lifespan,
+    telemetry=telemetry,
+    openapi_url="/openapi.json" if docs_enabled else None,
+    docs_url="/docs" if docs_enabled else None,
+    redoc_url="/redoc" if docs_enabled else None
+)
+
+if settings.docs_mode == "static":
+    # Schema built at image build (export_openapi.py): FastAPI serves the cached one
+    with open(settings.openapi_file) as f:
+        app.openapi_schema = json.load(f)
+
+# Sampling profiler and tracemalloc on demand (profiling.py): innermost, a
+# profiled request is sampled once admitted. Nothing installed without a token.
+if settings.profiling_token:
+    from profiling import ProfilingMiddleware, router as profiling_router
+    app.include_router(profiling_router)
+    app.add_middleware(ProfilingMiddleware, token=settings.profiling_token)
+
+# Shed load before latency collapses (admission.py)
+admission = AdmissionControl(
+    max_concurrency=settings.max_concurrency,
+    max_queue=settings.max_queue,
+    queue_timeout_seconds=settings.queue_timeout_seconds
+)
+# Also taken by each item of a batch (batch.py)
+app.state.admission = admission
+app.add_middleware(
+    AdmissionMiddleware,
+    admission=admission,
+    retry_after_seconds=settings.retry_after_seconds,
+    exempt_paths=settings.admission_exempt_paths
+)
+
+# Added last: outermost, also logs the requests shed by the admission control
+if settings.access_log:
+    app.add_middleware(
+        AccessLogMiddleware,
+        sample_rates=parse_sample_rates(settings.access_log_sample_rates),
+        slow_ms=settings.access_log_slow_ms
+    )
+
+# Admission queue span (tracing.py), around the access log and the admission control
+if settings.tracing:
+    app.add_middleware(tracing.TracingMiddleware)
+
+# Many sub-requests per round trip (batch.py)
+app.include_router(batch_router)
+
+if settings.bench_endpoints:
+    from bench_routes import router as bench_router
+    app.include_router(bench_router)
+
+
+# async: nothing blocks, no thread hop per request
 @app.get("/")
-def read_root():
+async def read_root(response: Response):
+    # Cacheable at the edge (CloudFront follows the origin Cache-Control)
+    response.headers["Cache-Control"] = "public, max-age=60"
     return {"message": "Hello EKS from FastAPI!"}
+
+
+# ALB health check and readiness probe: no schema, no cache, never shed
+@app.get("/health", include_in_schema=False)
+async def health():
+    return {"status": "ok"}
+
+
+@app.get("/metrics/admission")
+async def admission_metrics(request: Request):
+    if request.query_params.get("format") == "prometheus":
+        return Response(
+            admission.prometheus()
+            + "# TYPE fastapi_log_records_dropped_total counter\n"
+            + f"fastapi_log_records_dropped_total {dropped_records()}\n",
+            media_type="text/plain; version=0.0.4"
+        )
+    return {**admission.stats(), "log_records_dropped": dropped_records()}
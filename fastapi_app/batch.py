@@ -0,0 +1,139 @@
+"""Batch endpoint: many sub-requests in one POST.
+
+A chatty client pays TLS at the ALB, ALB routing and the middleware stack
+for every tiny call. ``POST /batch`` carries up to ``batch_max_items``
+sub-requests, dispatched concurrently (``batch_concurrency`` at once) to the
+routes of the app, in-process: no socket, no middleware. Each item gets its
+own status; a failing or slow item (``batch_item_timeout_seconds``, 504) does
+not fail the batch.
+
+Items carry the headers of the batch (``Authorization``, cookies,
+``X-Forwarded-*``...): they run as the caller. Items count in the admission
+control (``app.state.admission``, admission.py) without ever queuing again:
+they run on the slot of the batch, one at a time, and on the free slots they
+can take at once. A batch never holds more slots than it runs items, and an
+admitted batch is never shed, however many batches are in flight.
+
+    POST /batch
+    {"requests": [{"id": "a", "path": "/"}, {"id": "b", "method": "GET", "path": "/items", "query": {"page": "2"}}]}
+    -> {"responses": [{"id": "a", "status": 200, "body": {...}}, ...]}
+"""
+import asyncio
+import json
+from typing import Any, Literal
+from urllib.parse import urlencode
+
+from fastapi import APIRouter, HTTPException, Request
+from pydantic import BaseModel, Field
+from starlette.exceptions import HTTPException as StarletteHTTPException
+
+from settings import settings
+
+router = APIRouter()
+
+# Describe the body of the parent request, not the one of the item
+BODY_HEADERS = frozenset({b"content-type", b"content-length", b"content-encoding", b"transfer-encoding"})
+
+
+class BatchItem(BaseModel):
+    id: str
+    method: Literal["GET", "POST", "PUT", "PATCH", "DELETE"] = "GET"
+    path: str = Field(pattern=r"^/")
+    query: dict[str, str | list[str]] = {}
+    body: Any = None
+
+
+class BatchRequest(BaseModel):
+    requests: list[BatchItem]
+
+
+async def dispatch(request: Request, item: BatchItem) -> dict:
+    """Run `item` through the routes of the app, as if sent by the client of `request`"""
+    body = b"" if item.body is None else json.dumps(item.body).encode()
+    scope = {
+        **request.scope,
+        "method": item.method,
+        "path": item.path,
+        "raw_path": item.path.encode(),
+        "query_string": urlencode(item.query, doseq=True).encode(),
+        "headers": [
+            *((key, value) for key, value in request.scope["headers"] if key not in BODY_HEADERS),
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+        ],
+    }
+    for key in ("route", "endpoint", "path_params"):
+        scope.pop(key, None)
+
+    body_received = False
+    response_complete = asyncio.Event()
+
+    async def receive():
+        nonlocal body_received
+        if not body_received:
+            body_received = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        # As a client: no more body, disconnected once the response is complete.
+        # Streaming responses listen for it while they send.
+        await response_complete.wait()
+        return {"type": "http.disconnect"}
+
+    status = 500
+    content_type = ""
+    chunks = []
+
+    async def send(message):
+        nonlocal status, content_type
+        if message["type"] == "http.response.start":
+            status = message["status"]
+            content_type = dict(message.get("headers", [])).get(b"content-type", b"").decode()
+        elif message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body", False):
+                response_complete.set()
+
+    await request.app.router(scope, receive, send)
+    payload = b"".join(chunks)
+    if content_type.startswith("application/json") and payload:
+        return {"status": status, "body": json.loads(payload)}
+    return {"status": status, "body": payload.decode(errors="replace")}
+
+
+@router.post("/batch")
+async def batch(request: Request, batch: BatchRequest):
+    if len(batch.requests) > settings.batch_max_items:
+        raise HTTPException(status_code=413, detail=f"At most {settings.batch_max_items} requests per batch")
+    if any(item.path == request.url.path for item in batch.requests):
+        raise HTTPException(status_code=422, detail="Batches cannot be nested")
+
+    slots = asyncio.Semaphore(settings.batch_concurrency)
+    admission = getattr(request.app.state, "admission", None)
+    # The admission slot of the batch itself, taken by AdmissionMiddleware
+    batch_slot = asyncio.Lock()
+
+    async def execute(item: BatchItem) -> dict:
+        try:
+            return await asyncio.wait_for(dispatch(request, item), settings.batch_item_timeout_seconds)
+        except asyncio.TimeoutError:
+            return {"status": 504, "body": {"detail": "Sub-request timed out"}}
+        except StarletteHTTPException as error:
+            # Raised outside of a route, e.g. 404/405 of the router
+            return {"status": error.status_code, "body": {"detail": error.detail}}
+        except Exception as error:
+            return {"status": 500, "body": {"detail": f"{type(error).__name__}: {error}"}}
+
+    async def run(item: BatchItem) -> dict:
+        async with slots:
+            if admission is None:
+                result = await execute(item)
+            elif await admission.try_acquire():
+                try:
+                    result = await execute(item)
+                finally:
+                    admission.release()
+            else:
+                async with batch_slot:
+                    result = await execute(item)
+        return {"id": item.id, **result}
+
+    return {"responses": await asyncio.gather(*(run(item) for item in batch.requests))}
@@ -0,0 +1,86 @@
+"""Endpoints compared by tools/bench_app.py (FASTAPI_BENCH_ENDPOINTS=1 only)."""
+import asyncio
+import hashlib
+import time
+
+from typing import Literal
+
+from fastapi import APIRouter, Depends
+import httpx
+
+from clients import UpstreamClient, upstream
+from coalescing import single_flight
+from offload import run_in_process
+from streaming import stream_rows
+
+router = APIRouter(prefix="/bench")
+
+
+def cpu_work(rounds: int) -> str:
+    """CPU-bound and picklable: runs in the pool as well as inline"""
+    digest = b""
+    for _ in range(rounds):
+        digest = hashlib.sha256(digest).digest()
+    return digest.hex()
+
+
+@router.get("/async")
+async def bench_async():
+    await asyncio.sleep(0.01)  # awaited I/O
+    return {"ok": True}
+
+
+@router.get("/sync")
+def bench_sync():
+    time.sleep(0.01)  # blocking I/O, holds a threadpool token
+    return {"ok": True}
+
+
+@router.get("/cpu/inline")
+async def bench_cpu_inline(rounds: int = 200_000):
+    return {"digest": cpu_work(rounds)}
+
+
+@router.get("/cpu/offload")
+async def bench_cpu_offload(rounds: int = 200_000):
+    return {"digest": await run_in_process(cpu_work, rounds)}
+
+
+@router.get("/upstream/pooled")
+async def bench_upstream_pooled(client: UpstreamClient = Depends(upstream("stub"))):
+    return (await client.get("/echo")).json()
+
+
+@router.get("/upstream/per-request")
+async def bench_upstream_per_request(client: UpstreamClient = Depends(upstream("stub"))):
+    # Anti-pattern measured against the pooled client: new connection every call
+    async with httpx.AsyncClient(base_url=client.http.base_url) as http:
+        return (await http.get("/echo")).json()
+
+
+@router.get("/upstream/coalesced")
+@single_flight(timeout=5.0)
+async def bench_upstream_coalesced(client: UpstreamClient = Depends(upstream("stub"))):
+    # Identical concurrent calls share one upstream request
+    return (await client.get("/echo")).json()
+
+
+EXPORT_COLUMNS = ["id", "name", "value", "tags"]
+
+
+async def export_rows(rows: int):
+    for i in range(rows):
+        if i % 1000 == 0:
+            await asyncio.sleep(0)  # a database page
+        yield {"id": i, "name": f"item-{i}", "value": i * 0.5, "tags": "a|b|c"}
+
+
+@router.get("/export")
+async def bench_export(rows: int = 100_000, format: Literal["ndjson", "csv"] = "ndjson"):
+    return stream_rows(export_rows(rows), format, columns=EXPORT_COLUMNS)
+
+
+@router.get("/export/buffered")
+async def bench_export_buffered(rows: int = 100_000):
+    # Anti-pattern measured against the stream: whole payload in memory
+    return [row async for row in export_rows(rows)]
@@ -0,0 +1,119 @@
+"""Shared async clients of the downstream services.
+
+One ``httpx.AsyncClient`` per upstream, opened by the app lifespan and
+closed with it: connections are pooled (bounded) and kept alive, so TLS and
+TCP setup happen once instead of on every request. HTTP/2 is used when the
+``h2`` package is installed (``httpx[http2]``), the upstream multiplexes the
+requests of the pod on a few connections.
+
+Idempotent requests are retried on connection errors and 502/503/504 with
+full-jitter exponential backoff, so retries of many pods do not synchronise.
+
+Handlers get a client through a dependency::
+
+    @app.get("/catalog")
+    async def catalog(client: UpstreamClient = Depends(upstream("catalog"))):
+        return (await client.get("/items")).json()
+"""
+import asyncio
+import importlib.util
+import random
+
+from fastapi import Request
+import httpx
+
+
+RETRYABLE_STATUS = frozenset({502, 503, 504})
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+
+
+class UpstreamClient:
+    def __init__(self, name: str, base_url: str, settings, transport: httpx.AsyncBaseTransport = None):
+        self.name = name
+        # Client span per call (retries included), context propagated to the upstream
+        self.tracer = None
+        if settings.tracing:
+            from opentelemetry import trace
+            self.tracer = trace.get_tracer(__name__)
+        self.retries = settings.upstream_retries
+        self.retry_backoff_seconds = settings.upstream_retry_backoff_seconds
+        self.http = httpx.AsyncClient(
+            base_url=base_url,
+            http2=importlib.util.find_spec("h2") is not None,
+            limits=httpx.Limits(
+                max_connections=settings.upstream_max_connections,
+                max_keepalive_connections=settings.upstream_max_keepalive,
+                keepalive_expiry=settings.upstream_keepalive_seconds
+            ),
+            timeout=httpx.Timeout(
+                settings.upstream_timeout_seconds,
+                connect=settings.upstream_connect_timeout_seconds
+            ),
+            transport=transport
+        )
+
+    async def request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        if self.tracer is None:
+            return await self._request(method, url, **kwargs)
+
+        from opentelemetry import propagate
+        from opentelemetry.trace import SpanKind
+        with self.tracer.start_as_current_span(
+            f"{self.name} {method.upper()}", kind=SpanKind.CLIENT,
+            attributes={"http.request.method": method.upper(), "url.path": url, "peer.service": self.name}
+        ) as span:
+            headers = dict(kwargs.pop("headers", None) or {})
+            propagate.inject(headers)
+            response = await self._request(method, url, headers=headers, **kwargs)
+            span.set_attribute("http.response.status_code", response.status_code)
+            return response
+
+    async def _request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        attempts = 1 + (self.retries if method.upper() in IDEMPOTENT_METHODS else 0)
+        for attempt in range(attempts):
+            last = attempt == attempts - 1
+            try:
+                response = await self.http.request(method, url, **kwargs)
+            except (httpx.ConnectError, httpx.ConnectTimeout, httpx.RemoteProtocolError):
+                if last:
+                    raise
+            else:
+                if response.status_code not in RETRYABLE_STATUS or last:
+                    return response
+                await response.aclose()
+            # Full jitter: uniform in [0, backoff * 2^attempt]
+            await asyncio.sleep(random.uniform(0, self.retry_backoff_seconds * 2 ** attempt))
+
+    async def get(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("GET", url, **kwargs)
+
+    async def post(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("POST", url, **kwargs)
+
+    async def aclose(self):
+        await self.http.aclose()
+
+
+def parse_upstreams(upstreams: tuple) -> dict:
+    """("name=base_url", ...) -> {name: base_url}"""
+    return dict(upstream.split("=", 1) for upstream in upstreams)
+
+
+def open_clients(settings, transports: dict = None) -> dict:
+    transports = transports or {}
+    return {
+        name: UpstreamClient(name, base_url, settings, transport=transports.get(name))
+        for name, base_url in parse_upstreams(settings.upstreams).items()
+    }
+
+
+async def close_clients(clients: dict):
+    await asyncio.gather(*(client.aclose() for client in clients.values()))
+
+
+def upstream(name: str):
+    """Dependency returning the shared client of upstream `name`"""
+    # async: a sync dependency would cost a threadpool hop per request
+    async def dependency(request: Request) -> UpstreamClient:
+        return request.app.state.upstreams[name]
+    return dependency
@@ -0,0 +1,102 @@
+"""Single-flight: identical concurrent requests share one computation.
+
+Only GET and HEAD requests are coalesced, other methods call the handler
+straight through. The key is the method, the request path (route + path
+parameters), its query string normalised (parameters sorted) and the
+``vary`` headers, by default ``Authorization`` and ``Cookie``: the requests of
+two users never share a result. The first request runs the handler, the
+followers await the same task: they get its result or its exception. A
+follower gives up after ``timeout`` seconds (504), the computation keeps
+running for the others.
+
+The handler's result must depend on nothing else than the key: not on other
+headers (add them to ``vary``), the client address or state changing between
+the calls. Never use it on a handler that does.
+
+It sits behind the response caches: CloudFront (and its origin shield)
+collapse the misses of one edge location, single-flight collapses what is
+left in each pod. ``ttl`` additionally keeps the result in the pod for a few
+seconds, a micro-cache for content whose ``Cache-Control`` allows it.
+
+Handler parameters of type ``Response`` are per request: headers set on it
+by the leader are not seen by the followers, return a ``Response`` instead.
+"""
+import asyncio
+import functools
+import inspect
+import time
+
+from fastapi import HTTPException, Request
+
+
+COALESCED_METHODS = frozenset({"GET", "HEAD"})
+DEFAULT_VARY = ("authorization", "cookie")
+
+
+def coalesce_key(request: Request, vary: tuple = DEFAULT_VARY) -> tuple:
+    return (
+        request.method,
+        request.url.path,
+        tuple(sorted(request.query_params.multi_items())),
+        tuple(tuple(request.headers.getlist(header)) for header in vary),
+    )
+
+
+def single_flight(timeout: float = 10.0, ttl: float = 0.0, max_results: int = 1024, vary: tuple = DEFAULT_VARY):
+    def decorator(func):
+        if not inspect.iscoroutinefunction(func):
+            raise TypeError(f"single_flight needs an async handler, {func.__name__} is sync")
+        in_flight = {}
+        results = {}
+        signature = inspect.signature(func)
+        pass_request = "request" in signature.parameters
+        if not pass_request:
+            # FastAPI injects the Request the key is computed from
+            signature = signature.replace(parameters=[
+                *signature.parameters.values(),
+                inspect.Parameter("request", inspect.Parameter.KEYWORD_ONLY, annotation=Request)
+            ])
+
+        @functools.wraps(func)
+        async def wrapper(*args, request: Request, **kwargs):
+            if pass_request:
+                kwargs["request"] = request
+            if request.method not in COALESCED_METHODS:
+                return await func(*args, **kwargs)
+
+            key = coalesce_key(request, vary)
+            if ttl:
+                cached = results.get(key)
+                if cached and cached[0] > time.monotonic():
+                    return cached[1]
+
+            task = in_flight.get(key)
+            if task is None:
+                task = asyncio.ensure_future(func(*args, **kwargs))
+                in_flight[key] = task
+
+                def done(task):
+                    in_flight.pop(key, None)
+                    if task.cancelled():
+                        return
+                    # Retrieved here: every waiter may have given up on it (timeout,
+                    # disconnect), asyncio logs "Task exception was never retrieved" otherwise
+                    error = task.exception()
+                    if ttl and error is None:
+                        now = time.monotonic()
+                        if len(results) >= max_results:
+                            for expired in [k for k, (expires, _) in results.items() if expires <= now]:
+                                del results[expired]
+                        if len(results) < max_results:
+                            results[key] = (now + ttl, task.result())
+                task.add_done_callback(done)
+
+            try:
+                # shield: a follower timing out must not cancel the shared computation
+                return await asyncio.wait_for(asyncio.shield(task), timeout)
+            except asyncio.TimeoutError:
+                raise HTTPException(status_code=504, detail="Upstream computation timed out")
+
+        wrapper.__signature__ = signature
+        return wrapper
+    return decorator
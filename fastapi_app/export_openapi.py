@@ -0,0 +1,15 @@
+"""Write the OpenAPI schema of the app at image build time (FASTAPI_DOCS_MODE=static).
+
+    python export_openapi.py openapi.json
+"""
+import json
+import os
+import sys
+
+# Build the schema of the live app, not of the one loading this file
+os.environ["FASTAPI_DOCS_MODE"] = "live"
+
+from app import app  # noqa: E402
+
+with open(sys.argv[1] if len(sys.argv) > 1 else "openapi.json", "w") as f:
+    json.dump(app.openapi(), f, separators=(",", ":"))
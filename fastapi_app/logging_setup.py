@@ -0,0 +1,144 @@
+"""Structured, non-blocking logging.
+
+Every log call only puts the record in a bounded in-memory queue; a
+background thread (``QueueListener``) encodes it to JSON and writes it to
+stdout, where Fluent Bit picks it up. When the queue is full (stdout
+blocked) records are dropped and counted rather than making a request wait.
+
+``AccessLogMiddleware`` writes one JSON line per request, sampled per path
+(``access_log_sample_rates``): a high-volume route can log 1% of its calls,
+while errors (5xx) and slow requests are always logged.
+"""
+import json
+import logging
+from logging.handlers import QueueHandler, QueueListener
+import queue
+import random
+import sys
+import time
+
+
+# Attributes of every LogRecord: the others come from `extra=`
+RESERVED = frozenset(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+access_logger = logging.getLogger("fastapi.access")
+queue_handler = None
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": self.formatTime(record, "%Y-%m-%dT%H:%M:%S") + f".{int(record.msecs):03d}Z",
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        entry.update((key, value) for key, value in vars(record).items() if key not in RESERVED)
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=str, separators=(",", ":"))
+
+
+JsonFormatter.converter = time.gmtime
+
+
+class DroppingQueueHandler(QueueHandler):
+    """QueueHandler that drops records instead of blocking or raising when full"""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Keep the formatting (JSON) for the listener thread: only merge the args here
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def configure_logging(settings, filters: list = ()) -> QueueListener:
+    """Route the app and uvicorn loggers through the queue, return the started listener"""
+    global queue_handler
+    stream = logging.StreamHandler(sys.stdout)
+    stream.setFormatter(JsonFormatter())
+    handler = queue_handler = DroppingQueueHandler(queue.Queue(maxsize=settings.log_queue_size))
+    # Run in the thread of the log call (e.g. context of the request)
+    for log_filter in filters:
+        handler.addFilter(log_filter)
+
+    root = logging.getLogger()
+    root.handlers = [handler]
+    root.setLevel(settings.log_level)
+    # uvicorn installs its own handlers; its access log is replaced by AccessLogMiddleware
+    for name in ("uvicorn", "uvicorn.error", "uvicorn.access"):
+        logger = logging.getLogger(name)
+        logger.handlers = []
+        logger.propagate = True
+    logging.getLogger("uvicorn.access").disabled = True
+    # One INFO line per upstream call otherwise (clients.py)
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    listener = QueueListener(handler.queue, stream, respect_handler_level=False)
+    listener.start()
+    return listener
+
+
+def dropped_records() -> int:
+    return queue_handler.dropped if queue_handler else 0
+
+
+def parse_sample_rates(rates: tuple) -> dict:
+    """("path=rate", ...) -> {path: rate}"""
+    return {path: float(rate) for path, _, rate in (item.rpartition("=") for item in rates)}
+
+
+class AccessLogMiddleware:
+    """Pure ASGI middleware: one sampled JSON access log line per request"""
+
+    def __init__(self, app, sample_rates: dict = None, slow_ms: float = 1000.0):
+        self.app = app
+        self.sample_rates = sample_rates or {}
+        self.slow_ms = slow_ms
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            duration_ms = (time.perf_counter() - start) * 1000
+            rate = self.sample_rates.get(scope["path"], 1.0)
+            if status >= 500 or duration_ms >= self.slow_ms or (rate and random.random() < rate):
+                headers = dict(scope.get("headers", []))
+                access_logger.info("request", extra={
+                    "method": scope["method"],
+                    "path": scope["path"],
+                    "query": scope.get("query_string", b"").decode(errors="replace"),
+                    "status": status,
+                    "duration_ms": round(duration_ms, 2),
+                    "client": (scope.get("client") or ("", 0))[0],
+                    "user_agent": headers.get(b"user-agent", b"").decode(errors="replace"),
+                    "sample_rate": rate,
+                })
@@ -0,0 +1,38 @@
+"""Offload of CPU-bound work to a process pool.
+
+A CPU-bound call in an ``async def`` endpoint blocks the event loop, and in
+a ``def`` endpoint holds the GIL the loop needs: every other request of the
+pod waits either way. ``run_in_process`` runs it in another process and
+awaits the result. `func` and its arguments must be picklable (module-level
+functions).
+
+The pool is started and stopped by the app lifespan. Size it to the CPU
+request of the pod: processes beyond it only compete for the same quota.
+"""
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+import multiprocessing
+
+
+_pool: ProcessPoolExecutor | None = None
+
+
+def start(size: int):
+    global _pool
+    if size > 0:
+        # forkserver: no copy of the running event loop and its threads
+        _pool = ProcessPoolExecutor(max_workers=size, mp_context=multiprocessing.get_context("forkserver"))
+
+
+def shutdown():
+    global _pool
+    if _pool:
+        _pool.shutdown(wait=True, cancel_futures=True)
+        _pool = None
+
+
+async def run_in_process(func, *args, **kwargs):
+    if _pool is None:
+        raise RuntimeError("Process pool disabled (FASTAPI_PROCESS_POOL_SIZE=0)")
+    return await asyncio.get_running_loop().run_in_executor(_pool, partial(func, *args, **kwargs))
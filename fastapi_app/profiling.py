@@ -0,0 +1,280 @@
+"""On-demand profiling of a running pod (FASTAPI_PROFILING_TOKEN set only).
+
+CPU: a sampling profiler. A thread reads the stacks of every thread of the
+process (``sys._current_frames()``) every ``interval_ms``: the event loop,
+the threadpool of the sync endpoints, the log and span exporters. The
+profiled code is not instrumented, so the cost is the sampler thread taking
+the GIL briefly at each tick; with no profile running there is no thread
+and no hook at all. Idle stacks (loop waiting in ``select``, workers
+waiting for work) are left out.
+
+* ``GET /admin/profile/cpu?seconds=10`` samples the pod under its real
+  traffic for N seconds
+* a request with ``X-Profile: 1`` is sampled while it runs, the response
+  carries ``X-Profile-Id``, fetch it from ``GET /admin/profile/requests/{id}``.
+  An async request shares the loop: the profile shows the pod during the
+  request, not the request alone.
+
+Profiles are speedscope files (https://www.speedscope.app) or, with
+``format=collapsed``, folded stacks for flamegraph.pl.
+
+Memory: ``POST /admin/profile/memory/start`` turns tracemalloc on (it slows
+every allocation down while on), ``GET /admin/profile/memory`` returns the top
+allocation sites and the growth since the previous snapshot, ``POST
+/admin/profile/memory/stop`` turns it off.
+
+Every endpoint requires ``X-Profiling-Token``. They are not shed by the
+admission control (``/admin/profile/`` is an exempt prefix): they must answer
+when the pod is hot. Through a port forward, e.g. on Fargate and Karpenter
+(the classic Deployment is ``fastapi``, in ``default``):
+
+    kubectl -n fastapi port-forward deploy/fastapi-app 8000
+    curl -H "X-Profiling-Token: $TOKEN" "localhost:8000/admin/profile/cpu?seconds=30" > cpu.speedscope.json
+"""
+import asyncio
+from collections import Counter, OrderedDict
+import hmac
+import itertools
+import os
+import sys
+import threading
+import time
+import tracemalloc
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+
+from settings import settings
+
+
+# Leaf frames of threads waiting for work: not CPU
+IDLE_FRAMES = frozenset({
+    ("selectors.py", "select"),
+    ("threading.py", "wait"),
+    ("queue.py", "get"),
+    ("thread.py", "_worker"),
+})
+
+
+class StackSampler:
+    """Samples the stacks of every other thread of the process every `interval` seconds"""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.stacks = {}  # thread name -> Counter of stacks (root first)
+        self.samples = 0
+        self.started = self.stopped = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+
+    def start(self) -> "StackSampler":
+        self.started = time.perf_counter()
+        self._thread.start()
+        return self
+
+    def stop(self) -> "StackSampler":
+        self._stop.set()
+        self._thread.join()
+        self.stopped = time.perf_counter()
+        return self
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append((code.co_name, code.co_filename, code.co_firstlineno))
+                    frame = frame.f_back
+                if (os.path.basename(stack[0][1]), stack[0][0]) in IDLE_FRAMES:
+                    continue
+                stack.reverse()
+                self.stacks.setdefault(names.get(ident, str(ident)), Counter())[tuple(stack)] += 1
+            self.samples += 1
+
+    def collapsed(self) -> str:
+        """Folded stacks: `thread;root;...;leaf count` per line"""
+        lines = []
+        for thread, stacks in self.stacks.items():
+            for stack, count in stacks.most_common():
+                frames = ";".join(f"{name} ({os.path.basename(filename)}:{line})" for name, filename, line in stack)
+                lines.append(f"{thread};{frames} {count}")
+        return "\n".join(lines) + "\n"
+
+    def speedscope(self, name: str) -> dict:
+        """Speedscope file format: one sampled profile per thread"""
+        index = {}
+        profiles = []
+        for thread, stacks in self.stacks.items():
+            samples = []
+            weights = []
+            for stack, count in stacks.most_common():
+                samples.append([index.setdefault(frame, len(index)) for frame in stack])
+                weights.append(round(count * self.interval, 6))
+            profiles.append({
+                "type": "sampled",
+                "name": thread,
+                "unit": "seconds",
+                "startValue": 0,
+                "endValue": round(sum(weights), 6),
+                "samples": samples,
+                "weights": weights,
+            })
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": name,
+            "exporter": settings.service_name,
+            "activeProfileIndex": 0,
+            "shared": {"frames": [{"name": function, "file": filename, "line": line}
+                                  for function, filename, line in index]},
+            "profiles": profiles,
+        }
+
+
+# One sampler at a time: two would sample each other and double the cost
+_busy = threading.Lock()
+# Profiles of the last X-Profile requests, by id
+_recent: OrderedDict = OrderedDict()
+_ids = itertools.count(1)
+_previous_snapshot: tracemalloc.Snapshot | None = None
+
+
+def check_token(x_profiling_token: str = Header("")):
+    if not hmac.compare_digest(x_profiling_token.encode(), settings.profiling_token.encode()):
+        raise HTTPException(status_code=403, detail="Invalid X-Profiling-Token")
+
+
+router = APIRouter(prefix="/admin/profile", dependencies=[Depends(check_token)], include_in_schema=False)
+
+
+def render(sampler: StackSampler, name: str, format: str):
+    if format == "collapsed":
+        return PlainTextResponse(sampler.collapsed())
+    return sampler.speedscope(name)
+
+
+@router.get("/cpu")
+async def profile_cpu(
+        seconds: float = Query(10.0, gt=0),
+        interval_ms: float = Query(5.0, ge=1),
+        format: str = Query("speedscope", pattern="^(speedscope|collapsed)$")):
+    if seconds > settings.profiling_max_seconds:
+        raise HTTPException(status_code=422, detail=f"At most {settings.profiling_max_seconds} seconds")
+    if not _busy.acquire(blocking=False):
+        raise HTTPException(status_code=409, detail="A profile is already running")
+    try:
+        sampler = StackSampler(interval_ms / 1000).start()
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            sampler.stop()
+    finally:
+        _busy.release()
+    return render(sampler, f"{settings.service_name} {seconds:g}s", format)
+
+
+@router.get("/requests/{profile_id}")
+async def request_profile(
+        profile_id: int,
+        format: str = Query("speedscope", pattern="^(speedscope|collapsed)$")):
+    if profile_id not in _recent:
+        raise HTTPException(status_code=404, detail="Unknown or expired profile")
+    name, sampler = _recent[profile_id]
+    if sampler.stopped is None:
+        raise HTTPException(status_code=409, detail="Request still running")
+    return render(sampler, name, format)
+
+
+@router.post("/memory/start")
+async def memory_start(frames: int = Query(10, ge=1, le=100)):
+    global _previous_snapshot
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(frames)
+        _previous_snapshot = None
+    return {"tracing": True, "frames": tracemalloc.get_traceback_limit()}
+
+
+@router.post("/memory/stop")
+async def memory_stop():
+    global _previous_snapshot
+    tracemalloc.stop()
+    _previous_snapshot = None
+    return {"tracing": False}
+
+
+@router.get("/memory")
+async def memory_snapshot(
+        top: int = Query(25, ge=1, le=500),
+        group_by: str = Query("lineno", pattern="^(lineno|filename|traceback)$")):
+    """Top allocation sites, and their growth since the previous call"""
+    global _previous_snapshot
+    if not tracemalloc.is_tracing():
+        raise HTTPException(status_code=409, detail="tracemalloc is off, POST /admin/profile/memory/start")
+    snapshot = tracemalloc.take_snapshot().filter_traces([
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+    ])
+    current, peak = tracemalloc.get_traced_memory()
+
+    def site(stat) -> dict:
+        return {
+            "size_kib": round(stat.size / 1024, 1),
+            "count": stat.count,
+            "traceback": [f"{frame.filename}:{frame.lineno}" for frame in stat.traceback],
+        }
+
+    def growth(stat) -> dict:
+        return {**site(stat), "size_diff_kib": round(stat.size_diff / 1024, 1), "count_diff": stat.count_diff}
+
+    result = {
+        "traced_kib": round(current / 1024, 1),
+        "peak_kib": round(peak / 1024, 1),
+        "top": [site(stat) for stat in snapshot.statistics(group_by)[:top]],
+    }
+    if _previous_snapshot is not None:
+        result["growth"] = [growth(stat) for stat in snapshot.compare_to(_previous_snapshot, group_by)[:top]]
+    _previous_snapshot = snapshot
+    return result
+
+
+class ProfilingMiddleware:
+    """Pure ASGI middleware: samples the requests sent with `X-Profile: 1` and a valid token"""
+
+    def __init__(self, app, token: str, interval_ms: float = 1.0, keep: int = 8):
+        self.app = app
+        self.token = token.encode()
+        self.interval = interval_ms / 1000
+        self.keep = keep
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        headers = dict(scope["headers"])
+        if headers.get(b"x-profile") != b"1" or not hmac.compare_digest(headers.get(b"x-profiling-token", b""), self.token):
+            await self.app(scope, receive, send)
+            return
+        if not _busy.acquire(blocking=False):
+            await self.app(scope, receive, send)
+            return
+
+        profile_id = next(_ids)
+        sampler = StackSampler(self.interval).start()
+        _recent[profile_id] = (f"{scope['method']} {scope['path']}", sampler)
+        while len(_recent) > self.keep:
+            _recent.popitem(last=False)
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = [*message.get("headers", []), (b"x-profile-id", str(profile_id).encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            sampler.stop()
+            _busy.release()
@@ -0,0 +1,75 @@
+"""App settings, read once from ``FASTAPI_*`` environment variables.
+
+The Deployments set them in the container ``env`` (e.g.
+``FASTAPI_MAX_CONCURRENCY=32``); unset variables keep the defaults below.
+"""
+from dataclasses import dataclass, fields
+import os
+
+
+@dataclass(frozen=True)
+class Settings:
+    # Admission control (admission.py): requests served at once, waiting, and for how long
+    max_concurrency: int = 64
+    max_queue: int = 128
+    queue_timeout_seconds: float = 2.0
+    retry_after_seconds: int = 1
+    # Never queued nor shed, "/"-terminated entries are prefixes
+    admission_exempt_paths: tuple = ("/health", "/metrics/admission", "/docs", "/openapi.json", "/admin/profile/")
+    # Logging (logging_setup.py): JSON lines on stdout, written by a background thread
+    log_level: str = "INFO"
+    log_queue_size: int = 10000
+    access_log: bool = True
+    # "path=rate" sampling of the access log, errors and slow requests are always logged
+    access_log_sample_rates: tuple = ("/health=0", "/metrics/admission=0")
+    access_log_slow_ms: float = 1000.0
+    # Tracing (tracing.py): head sampling of the new traces, exporter "otlp", "console" or "file"
+    tracing: bool = False
+    service_name: str = "fastapi-app"
+    trace_sample_ratio: float = 1.0
+    trace_exporter: str = "otlp"
+    trace_file: str = "traces.jsonl"
+    trace_exclude_paths: tuple = ("/health", "/metrics/admission")
+    # OpenAPI: "live" (built on the first /docs), "static" (built at image build, export_openapi.py), "off"
+    docs_mode: str = "live"
+    openapi_file: str = "openapi.json"
+    # Worker threads of the sync (`def`) endpoints, anyio default 40
+    threadpool_size: int = 40
+    # Processes of offload.run_in_process for CPU-bound work, 0 disables the pool
+    process_pool_size: int = 1
+    # Downstream services (clients.py), "name=base_url,name=base_url"
+    upstreams: tuple = ()
+    upstream_max_connections: int = 100
+    upstream_max_keepalive: int = 20
+    upstream_keepalive_seconds: float = 30.0
+    upstream_connect_timeout_seconds: float = 1.0
+    upstream_timeout_seconds: float = 5.0
+    upstream_retries: int = 2
+    upstream_retry_backoff_seconds: float = 0.1
+    # POST /batch (batch.py): sub-requests per call, run at once, and their timeout
+    batch_max_items: int = 50
+    batch_concurrency: int = 10
+    batch_item_timeout_seconds: float = 5.0
+    # /admin/profile/* endpoints and X-Profile header (profiling.py), off without a token
+    profiling_token: str = ""
+    profiling_max_seconds: float = 60.0
+    # /bench/* endpoints of tools/bench_app.py
+    bench_endpoints: bool = False
+
+    @classmethod
+    def from_env(cls, environ=os.environ) -> "Settings":
+        values = {}
+        for field in fields(cls):
+            raw = environ.get(f"FASTAPI_{field.name.upper()}")
+            if raw is None:
+                continue
+            if field.type is bool:
+                values[field.name] = raw.lower() in ("1", "true", "yes")
+            elif field.type is tuple:
+                values[field.name] = tuple(item.strip() for item in raw.split(",") if item.strip())
+            else:
+                values[field.name] = field.type(raw)
+        return cls(**values)
+
+
+settings = Settings.from_env()
@@ -0,0 +1,25 @@
+"""Local stand-in for a downstream service, for tests and benchmarks.
+
+    uvicorn stub_upstream:app --port 8081
+    FASTAPI_UPSTREAMS=stub=http://127.0.0.1:8081 uvicorn app:app
+
+In tests it runs in-process, without a socket:
+``open_clients(settings, transports={"stub": httpx.ASGITransport(stub_upstream.app)})``.
+
+``/echo`` answers after ``delay_ms`` and fails with 503 for a ``fail_rate``
+share of the calls, to exercise the timeouts and the retries.
+"""
+import asyncio
+import random
+
+from fastapi import FastAPI, HTTPException
+
+app = FastAPI()
+
+
+@app.get("/echo")
+async def echo(delay_ms: int = 5, fail_rate: float = 0.0, payload: str = "pong"):
+    await asyncio.sleep(delay_ms / 1000)
+    if random.random() < fail_rate:
+        raise HTTPException(status_code=503, detail="Stub failure")
+    return {"payload": payload}
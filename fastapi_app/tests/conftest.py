@@ -0,0 +1,5 @@
+"""The modules of the app are imported as top-level names, as in the image"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,113 @@
+import asyncio
+
+from fastapi import FastAPI
+import httpx
+
+from admission import AdmissionControl, AdmissionMiddleware
+
+
+def admission_app(max_concurrency=1, max_queue=1, queue_timeout_seconds=1.0, exempt_paths=("/health", "/admin/")):
+    admission = AdmissionControl(max_concurrency, max_queue, queue_timeout_seconds)
+    app = FastAPI()
+    app.add_middleware(AdmissionMiddleware, admission=admission, retry_after_seconds=3, exempt_paths=exempt_paths)
+    release = asyncio.Event()
+
+    @app.get("/hold")
+    async def hold():
+        await release.wait()
+        return {"ok": True}
+
+    @app.get("/health")
+    async def health():
+        return {"status": "ok"}
+
+    @app.get("/health/deep")
+    async def deep_health():
+        return {"status": "ok"}
+
+    @app.post("/admin/profile/memory/start")
+    async def admin():
+        return {}
+
+    return app, admission, release
+
+
+async def wait_for(condition):
+    while not condition():
+        await asyncio.sleep(0.001)
+
+
+def test_queue_full_is_429():
+    app, admission, release = admission_app(max_concurrency=1, max_queue=1)
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            first = asyncio.ensure_future(client.get("/hold"))
+            await wait_for(lambda: admission.in_flight == 1)
+            queued = asyncio.ensure_future(client.get("/hold"))
+            await wait_for(lambda: admission.queued == 1)
+            rejected = await client.get("/hold")
+            release.set()
+            return rejected, await first, await queued
+    rejected, first, queued = asyncio.run(run())
+    assert rejected.status_code == 429
+    assert rejected.headers["retry-after"] == "3"
+    assert rejected.json()["reason"] == "queue_full"
+    assert first.status_code == queued.status_code == 200
+    assert admission.stats()["rejected"] == {"queue_full": 1, "deadline": 0}
+    assert admission.in_flight == 0
+
+
+def test_queue_deadline_is_503():
+    app, admission, release = admission_app(max_concurrency=1, max_queue=5, queue_timeout_seconds=0.05)
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            first = asyncio.ensure_future(client.get("/hold"))
+            await wait_for(lambda: admission.in_flight == 1)
+            expired = await client.get("/hold")
+            release.set()
+            return expired, await first
+    expired, first = asyncio.run(run())
+    assert expired.status_code == 503
+    assert expired.json()["reason"] == "deadline"
+    assert first.status_code == 200
+    assert admission.stats()["rejected"] == {"queue_full": 0, "deadline": 1}
+    assert admission.queued == 0
+
+
+def test_exempt_paths_are_not_shed():
+    app, admission, release = admission_app(max_concurrency=1, max_queue=0)
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            first = asyncio.ensure_future(client.get("/hold"))
+            await wait_for(lambda: admission.in_flight == 1)
+            health = await client.get("/health")
+            admin = await client.post("/admin/profile/memory/start")
+            # Exact path, not a prefix
+            deep_health = await client.get("/health/deep")
+            shed = await client.get("/hold")
+            release.set()
+            await first
+            return health, admin, deep_health, shed
+    health, admin, deep_health, shed = asyncio.run(run())
+    assert health.status_code == admin.status_code == 200
+    assert deep_health.status_code == shed.status_code == 429
+
+
+def test_profiling_endpoints_are_exempt_by_default():
+    from settings import Settings
+    middleware = AdmissionMiddleware(None, AdmissionControl(1, 1, 1.0), exempt_paths=Settings().admission_exempt_paths)
+    for path in ("/admin/profile/cpu", "/admin/profile/memory", "/admin/profile/memory/start",
+                 "/admin/profile/memory/stop", "/admin/profile/requests/3", "/health"):
+        assert middleware.exempt(path), path
+    assert not middleware.exempt("/admin/profiles")
+    assert not middleware.exempt("/")
+
+
+def test_prometheus_format():
+    admission = AdmissionControl(4, 8, 1.0)
+    text = admission.prometheus()
+    assert "fastapi_admission_in_flight 0" in text
+    assert 'fastapi_admission_rejected_total{reason="deadline"} 0' in text
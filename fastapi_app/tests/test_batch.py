@@ -0,0 +1,163 @@
+import asyncio
+import dataclasses
+
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.testclient import TestClient
+import httpx
+import pytest
+
+from admission import AdmissionControl, AdmissionMiddleware
+import batch
+from batch import router as batch_router
+from streaming import stream_rows
+
+
+def batch_app(admission: AdmissionControl = None) -> FastAPI:
+    app = FastAPI()
+    app.include_router(batch_router)
+    if admission:
+        app.state.admission = admission
+        app.add_middleware(AdmissionMiddleware, admission=admission)
+
+    @app.get("/whoami")
+    async def whoami(request: Request):
+        if admission:
+            app.state.peak_in_flight = max(getattr(app.state, "peak_in_flight", 0), admission.in_flight)
+        await asyncio.sleep(0.01)
+        return {header: request.headers.get(header) for header in ("authorization", "cookie", "x-forwarded-for")}
+
+    @app.get("/items/{item_id}")
+    async def read_item(item_id: int, fields: str = ""):
+        if item_id == 0:
+            raise HTTPException(status_code=404, detail="No such item")
+        return {"id": item_id, "fields": fields}
+
+    @app.post("/items")
+    async def create_item(item: dict):
+        return {"created": item}
+
+    @app.get("/slow")
+    async def slow():
+        await asyncio.sleep(1)
+        return {}
+
+    @app.get("/export")
+    async def export(rows: int = 3):
+        async def numbers():
+            for number in range(rows):
+                yield {"n": number}
+        return stream_rows(numbers(), "ndjson")
+
+    @app.get("/crash")
+    async def crash():
+        raise RuntimeError("boom")
+
+    return app
+
+
+@pytest.fixture(autouse=True)
+def batch_settings(monkeypatch):
+    monkeypatch.setattr(batch, "settings", dataclasses.replace(
+        batch.settings, batch_max_items=5, batch_concurrency=2, batch_item_timeout_seconds=0.1
+    ))
+
+
+@pytest.fixture
+def client():
+    return TestClient(batch_app())
+
+
+def test_items_get_their_own_status(client):
+    response = client.post("/batch", json={"requests": [
+        {"id": "a", "path": "/items/1", "query": {"fields": "name"}},
+        {"id": "b", "path": "/items/0"},
+        {"id": "c", "method": "POST", "path": "/items", "body": {"name": "x"}},
+        {"id": "d", "path": "/missing"},
+        {"id": "e", "method": "DELETE", "path": "/items/1"},
+    ]})
+    assert response.status_code == 200
+    assert response.json()["responses"] == [
+        {"id": "a", "status": 200, "body": {"id": 1, "fields": "name"}},
+        {"id": "b", "status": 404, "body": {"detail": "No such item"}},
+        {"id": "c", "status": 200, "body": {"created": {"name": "x"}}},
+        {"id": "d", "status": 404, "body": {"detail": "Not Found"}},
+        {"id": "e", "status": 405, "body": {"detail": "Method Not Allowed"}},
+    ]
+
+
+def test_slow_or_failing_item_does_not_fail_the_batch(client):
+    response = client.post("/batch", json={"requests": [
+        {"id": "slow", "path": "/slow"},
+        {"id": "crash", "path": "/crash"},
+        {"id": "ok", "path": "/items/2"},
+    ]})
+    assert response.status_code == 200
+    slow, crash, ok = response.json()["responses"]
+    assert slow == {"id": "slow", "status": 504, "body": {"detail": "Sub-request timed out"}}
+    assert crash["status"] == 500
+    assert crash["body"]["detail"] == "RuntimeError: boom"
+    assert ok["status"] == 200
+
+
+def test_streaming_item_completes(client):
+    # A streaming route listens for the disconnect while it sends: receive must wait
+    response = client.post("/batch", json={"requests": [
+        {"id": "export", "path": "/export", "query": {"rows": "3"}},
+        {"id": "ok", "path": "/items/2"},
+    ]})
+    assert response.status_code == 200
+    export, ok = response.json()["responses"]
+    assert export == {"id": "export", "status": 200, "body": '{"n":0}\n{"n":1}\n{"n":2}\n'}
+    assert ok["status"] == 200
+
+
+def test_too_many_items_is_413(client):
+    response = client.post("/batch", json={"requests": [{"id": str(i), "path": "/items/1"} for i in range(6)]})
+    assert response.status_code == 413
+
+
+def test_nested_batch_is_422(client):
+    response = client.post("/batch", json={"requests": [{"id": "a", "method": "POST", "path": "/batch"}]})
+    assert response.status_code == 422
+
+
+def test_items_run_as_the_caller(client):
+    response = client.post(
+        "/batch",
+        json={"requests": [{"id": "a", "path": "/whoami"}, {"id": "b", "method": "POST", "path": "/items", "body": {}}]},
+        headers={"Authorization": "Bearer alice", "Cookie": "session=1", "X-Forwarded-For": "10.0.0.1"}
+    )
+    whoami, created = response.json()["responses"]
+    assert whoami["body"] == {"authorization": "Bearer alice", "cookie": "session=1", "x-forwarded-for": "10.0.0.1"}
+    # Body headers are the ones of the item
+    assert created == {"id": "b", "status": 200, "body": {"created": {}}}
+
+
+def test_items_take_free_admission_slots():
+    # The batch holds one slot, its items take the other one and share the batch's
+    admission = AdmissionControl(max_concurrency=2, max_queue=0, queue_timeout_seconds=1.0)
+    app = batch_app(admission)
+    response = TestClient(app).post("/batch", json={"requests": [{"id": str(i), "path": "/whoami"} for i in range(4)]})
+    assert response.status_code == 200
+    assert [item["status"] for item in response.json()["responses"]] == [200] * 4
+    assert app.state.peak_in_flight == 2
+    assert admission.in_flight == 0
+
+
+def test_concurrent_batches_at_the_limit_are_not_shed():
+    # Every slot held by a batch: the items run on them instead of queuing
+    admission = AdmissionControl(max_concurrency=2, max_queue=10, queue_timeout_seconds=0.3)
+    app = batch_app(admission)
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            return await asyncio.gather(*(
+                client.post("/batch", json={"requests": [{"id": "a", "path": "/whoami"}, {"id": "b", "path": "/whoami"}]})
+                for _ in range(2)
+            ))
+    for response in asyncio.run(run()):
+        assert response.status_code == 200
+        assert [item["status"] for item in response.json()["responses"]] == [200, 200]
+    assert app.state.peak_in_flight == 2
+    assert admission.stats()["rejected"] == {"queue_full": 0, "deadline": 0}
+    assert admission.in_flight == 0
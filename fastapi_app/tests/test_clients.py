@@ -0,0 +1,109 @@
+import asyncio
+
+import httpx
+
+import clients
+from clients import UpstreamClient
+from settings import Settings
+import stub_upstream
+
+
+class CountingTransport(httpx.ASGITransport):
+    """The in-process stub upstream, counting the calls"""
+
+    def __init__(self, app):
+        super().__init__(app=app)
+        self.calls = 0
+
+    async def handle_async_request(self, request):
+        self.calls += 1
+        return await super().handle_async_request(request)
+
+
+def call(client: UpstreamClient, method: str, url: str, **kwargs) -> httpx.Response:
+    async def run():
+        try:
+            return await client.request(method, url, **kwargs)
+        finally:
+            await client.aclose()
+    return asyncio.run(run())
+
+
+def record_sleeps(monkeypatch) -> list:
+    """Upper bounds of the jittered backoffs; the sleeps themselves are skipped"""
+    sleeps = []
+
+    def uniform(low, high):
+        assert low == 0
+        sleeps.append(high)
+        return 0
+    monkeypatch.setattr(clients.random, "uniform", uniform)
+    return sleeps
+
+
+def test_success_is_not_retried(monkeypatch):
+    sleeps = record_sleeps(monkeypatch)
+    transport = CountingTransport(stub_upstream.app)
+    client = UpstreamClient("stub", "http://stub", Settings(), transport=transport)
+    response = call(client, "GET", "/echo", params={"delay_ms": 0, "payload": "hi"})
+    assert response.status_code == 200
+    assert response.json() == {"payload": "hi"}
+    assert transport.calls == 1
+    assert sleeps == []
+
+
+def test_retries_with_exponential_backoff(monkeypatch):
+    sleeps = record_sleeps(monkeypatch)
+    transport = CountingTransport(stub_upstream.app)
+    settings = Settings(upstream_retries=3, upstream_retry_backoff_seconds=0.1)
+    client = UpstreamClient("stub", "http://stub", settings, transport=transport)
+    response = call(client, "GET", "/echo", params={"delay_ms": 0, "fail_rate": 1.0})
+    # The last status is returned once the retries are spent
+    assert response.status_code == 503
+    assert transport.calls == 4
+    assert sleeps == [0.1, 0.2, 0.4]
+
+
+def test_retry_recovers(monkeypatch):
+    record_sleeps(monkeypatch)
+    statuses = iter([503, 502, 200])
+    transport = httpx.MockTransport(lambda request: httpx.Response(next(statuses)))
+    client = UpstreamClient("stub", "http://stub", Settings(upstream_retries=2), transport=transport)
+    assert call(client, "GET", "/echo").status_code == 200
+
+
+def test_non_idempotent_is_not_retried(monkeypatch):
+    sleeps = record_sleeps(monkeypatch)
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        return httpx.Response(503)
+    client = UpstreamClient("stub", "http://stub", Settings(upstream_retries=2), transport=httpx.MockTransport(handler))
+    assert call(client, "POST", "/orders", json={}).status_code == 503
+    assert len(requests) == 1
+    assert sleeps == []
+
+
+def test_connect_error_raised_after_retries(monkeypatch):
+    sleeps = record_sleeps(monkeypatch)
+
+    def handler(request):
+        raise httpx.ConnectError("refused", request=request)
+    client = UpstreamClient("stub", "http://stub", Settings(upstream_retries=2), transport=httpx.MockTransport(handler))
+    try:
+        call(client, "GET", "/echo")
+    except httpx.ConnectError:
+        pass
+    else:
+        raise AssertionError("ConnectError not raised")
+    assert len(sleeps) == 2
+
+
+def test_open_clients_uses_transports():
+    clients_by_name = clients.open_clients(
+        Settings(upstreams=("stub=http://stub",)),
+        transports={"stub": httpx.ASGITransport(app=stub_upstream.app)}
+    )
+    response = call(clients_by_name["stub"], "GET", "/echo", params={"delay_ms": 0})
+    assert response.json() == {"payload": "pong"}
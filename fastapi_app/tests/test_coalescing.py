@@ -0,0 +1,183 @@
+import asyncio
+import gc
+
+from fastapi import FastAPI, HTTPException, Request
+import httpx
+
+from coalescing import single_flight
+
+
+def gather(app: FastAPI, *requests) -> list:
+    """Send `requests` ((method, url, kwargs), ...) concurrently, return the responses"""
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            return await asyncio.gather(*(client.request(method, url, **kwargs) for method, url, kwargs in requests))
+    return asyncio.run(run())
+
+
+def test_concurrent_requests_share_one_call():
+    app = FastAPI()
+    calls = []
+
+    @app.get("/slow")
+    @single_flight()
+    async def slow(item: str = ""):
+        calls.append(item)
+        call = len(calls)
+        await asyncio.sleep(0.05)
+        return {"item": item, "call": call}
+
+    responses = gather(app, *[("GET", "/slow?item=a", {})] * 5, ("GET", "/slow?item=b", {}))
+    assert len({response.json()["call"] for response in responses[:5]}) == 1
+    assert {response.json()["item"] for response in responses[:5]} == {"a"}
+    assert responses[5].json()["item"] == "b"
+    assert sorted(calls) == ["a", "b"]
+
+
+def test_error_propagates_to_every_follower():
+    app = FastAPI()
+    calls = []
+
+    @app.get("/failing")
+    @single_flight()
+    async def failing():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        raise HTTPException(status_code=502, detail="Upstream failed")
+
+    responses = gather(app, *[("GET", "/failing", {})] * 3)
+    assert [response.status_code for response in responses] == [502] * 3
+    assert responses[0].json() == {"detail": "Upstream failed"}
+    assert len(calls) == 1
+    # Errors are not cached: the next request computes again
+    assert gather(app, ("GET", "/failing", {}))[0].status_code == 502
+    assert len(calls) == 2
+
+
+def test_timeout_is_504_and_computation_goes_on():
+    app = FastAPI()
+    finished = []
+
+    @app.get("/stuck")
+    @single_flight(timeout=0.05)
+    async def stuck():
+        await asyncio.sleep(0.1)
+        finished.append(1)
+        return {}
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            responses = await asyncio.gather(client.get("/stuck"), client.get("/stuck"))
+            # Shielded: the timeouts of the waiters do not cancel it
+            await asyncio.sleep(0.1)
+            return responses
+    responses = asyncio.run(run())
+    assert [response.status_code for response in responses] == [504, 504]
+    assert finished == [1]
+
+
+def test_ttl_caches_results():
+    app = FastAPI()
+    calls = []
+
+    @app.get("/cached")
+    @single_flight(ttl=60)
+    async def cached():
+        calls.append(1)
+        return {"call": len(calls)}
+
+    assert gather(app, ("GET", "/cached", {}))[0].json() == {"call": 1}
+    assert gather(app, ("GET", "/cached", {}))[0].json() == {"call": 1}
+    assert len(calls) == 1
+
+
+def test_sync_handler_is_refused():
+    try:
+        single_flight()(lambda: None)
+    except TypeError:
+        pass
+    else:
+        raise AssertionError("TypeError not raised")
+
+
+def test_users_do_not_share_results():
+    app = FastAPI()
+    calls = []
+
+    @app.get("/me")
+    @single_flight()
+    async def me(request: Request):
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return {"user": request.headers.get("authorization"), "session": request.cookies.get("session")}
+
+    responses = gather(
+        app,
+        ("GET", "/me", {"headers": {"Authorization": "alice"}}),
+        ("GET", "/me", {"headers": {"Authorization": "bob"}}),
+        ("GET", "/me", {"headers": {"Authorization": "alice", "Cookie": "session=2"}}),
+        ("GET", "/me", {"headers": {"Authorization": "alice"}}),
+    )
+    assert [response.json() for response in responses] == [
+        {"user": "alice", "session": None},
+        {"user": "bob", "session": None},
+        {"user": "alice", "session": "2"},
+        {"user": "alice", "session": None},
+    ]
+    assert len(calls) == 3
+
+
+def test_vary_headers():
+    app = FastAPI()
+
+    @app.get("/greeting")
+    @single_flight(vary=("accept-language",))
+    async def greeting(request: Request):
+        await asyncio.sleep(0.05)
+        return {"language": request.headers.get("accept-language")}
+
+    responses = gather(
+        app,
+        ("GET", "/greeting", {"headers": {"Accept-Language": "fr"}}),
+        ("GET", "/greeting", {"headers": {"Accept-Language": "en"}}),
+    )
+    assert [response.json()["language"] for response in responses] == ["fr", "en"]
+
+
+def test_only_get_and_head_are_coalesced():
+    app = FastAPI()
+    calls = []
+
+    @app.post("/orders")
+    @single_flight()
+    async def create_order(order: dict):
+        calls.append(order)
+        await asyncio.sleep(0.05)
+        return {"order": order}
+
+    responses = gather(app, ("POST", "/orders", {"json": {"n": 1}}), ("POST", "/orders", {"json": {"n": 2}}))
+    assert [response.json() for response in responses] == [{"order": {"n": 1}}, {"order": {"n": 2}}]
+    assert len(calls) == 2
+
+
+def test_error_after_every_waiter_gave_up_is_retrieved():
+    app = FastAPI()
+
+    @app.get("/late-failure")
+    @single_flight(timeout=0.01)
+    async def late_failure():
+        await asyncio.sleep(0.05)
+        raise HTTPException(status_code=502, detail="Upstream failed")
+
+    async def run():
+        unhandled = []
+        asyncio.get_running_loop().set_exception_handler(lambda loop, context: unhandled.append(context))
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            response = await client.get("/late-failure")
+        # The handler fails once its only waiter timed out
+        await asyncio.sleep(0.1)
+        gc.collect()
+        return response, unhandled
+    response, unhandled = asyncio.run(run())
+    assert response.status_code == 504
+    assert unhandled == []
@@ -0,0 +1,178 @@
+"""OpenTelemetry tracing of the requests (FASTAPI_TRACING=1).
+
+FastAPI opens the server span of each request, outside of every middleware
+(shed requests are traced too), and the spans of the dependencies, endpoint
+and serialization. ``start()`` gives it the tracer provider;
+``TracingMiddleware`` adds an ``admission.queue`` child span for the time
+spent waiting for a slot (admission.py).
+
+Trace ids are X-Ray ids and follow the ALB: a request carrying only
+``X-Amzn-Trace-Id: Root=1-...`` (added by the ALB) gets the ALB trace id,
+so a trace matches the ALB access log line of the request and its
+``request_processing_time``/``target_processing_time``. A full X-Ray or W3C
+context (``Parent=``, ``traceparent``) from a caller is continued as usual,
+and propagated to the upstreams (clients.py).
+
+Sampling is done twice:
+
+* head, in the app: ``trace_sample_ratio`` of the new traces, callers'
+  decisions are kept (``ParentBased``). Unsampled requests cost a no-op span.
+* tail, in the collector (my_fastapi_eks/common/otel_collector.py): keeps the
+  errors and slow traces, and a share of the rest.
+
+Spans are exported by a background thread in batches: ``otlp`` (to the
+collector, ``OTEL_EXPORTER_OTLP_ENDPOINT``), or ``console``/``file`` (JSON
+lines in ``trace_file``) to look at traces without a collector.
+"""
+import contextvars
+import logging
+
+from opentelemetry import propagate, trace
+from opentelemetry.context import Context
+from opentelemetry.propagators.aws import AwsXRayPropagator
+from opentelemetry.propagators.composite import CompositePropagator
+from opentelemetry.sdk.extension.aws.trace import AwsXRayIdGenerator
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter
+from opentelemetry.sdk.trace.sampling import ParentBased, TraceIdRatioBased
+from opentelemetry.propagators.textmap import TextMapPropagator, default_getter
+from opentelemetry.trace.propagation.tracecontext import TraceContextTextMapPropagator
+
+
+ALB_HEADER = "x-amzn-trace-id"
+
+_provider: TracerProvider | None = None
+# Trace id of the ALB for the server span of the request, see AlbTraceIdPropagator
+_alb_trace_id = contextvars.ContextVar("alb_trace_id", default=None)
+
+
+class AlbTraceIdPropagator(TextMapPropagator):
+    """Reads the ALB trace id (`Root=` without `Parent=`) for AlbTraceIdGenerator.
+
+    There is no parent span to continue: the id is kept for the server span
+    FastAPI starts next, in the task of the request.
+    """
+
+    def extract(self, carrier, context=None, getter=default_getter):
+        if not trace.get_current_span(context).get_span_context().is_valid:
+            _alb_trace_id.set(alb_trace_id(next(iter(getter.get(carrier, ALB_HEADER) or []), None)))
+        return context if context is not None else Context()
+
+    def inject(self, carrier, context=None, setter=None):
+        # Injected by AwsXRayPropagator, with the parent
+        pass
+
+    @property
+    def fields(self) -> set:
+        return {ALB_HEADER}
+
+
+class AlbTraceIdGenerator(AwsXRayIdGenerator):
+    """X-Ray trace ids, the one of the ALB when the request carries it"""
+
+    def generate_trace_id(self) -> int:
+        return _alb_trace_id.get() or super().generate_trace_id()
+
+
+def alb_trace_id(header: str | None) -> int | None:
+    """Trace id of `Root=1-5759e988-bd862e3fe1be46a994272793;...`, None if absent"""
+    for field in (header or "").split(";"):
+        key, _, value = field.strip().partition("=")
+        if key == "Root":
+            _, _, epoch_and_id = value.partition("-")
+            try:
+                return int(epoch_and_id.replace("-", ""), 16) or None
+            except ValueError:
+                return None
+    return None
+
+
+def xray_id(trace_id: int) -> str:
+    """0x5759e988bd86... -> 1-5759e988-bd86...: the form of the ALB access logs"""
+    hex_id = format(trace_id, "032x")
+    return f"1-{hex_id[:8]}-{hex_id[8:]}"
+
+
+def start(settings) -> TracerProvider:
+    """Install the tracer provider and propagators, spans are exported in the background"""
+    global _provider
+    if settings.trace_exporter == "otlp":
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        exporter = OTLPSpanExporter()
+    elif settings.trace_exporter == "console":
+        exporter = ConsoleSpanExporter()
+    elif settings.trace_exporter == "file":
+        exporter = ConsoleSpanExporter(
+            out=open(settings.trace_file, "a"),
+            formatter=lambda span: span.to_json(indent=None) + "\n"
+        )
+    else:
+        raise ValueError(f"Unknown FASTAPI_TRACE_EXPORTER {settings.trace_exporter!r}, expected otlp, console or file")
+
+    _provider = TracerProvider(
+        sampler=ParentBased(TraceIdRatioBased(settings.trace_sample_ratio)),
+        id_generator=AlbTraceIdGenerator(),
+        # + OTEL_RESOURCE_ATTRIBUTES (pod, namespace, node) set by the Deployment
+        resource=Resource.create({"service.name": settings.service_name})
+    )
+    _provider.add_span_processor(BatchSpanProcessor(exporter))
+    trace.set_tracer_provider(_provider)
+    # Composite: the ALB one last, once the others had their chance
+    propagate.set_global_textmap(CompositePropagator([
+        AwsXRayPropagator(), TraceContextTextMapPropagator(), AlbTraceIdPropagator()
+    ]))
+    return _provider
+
+
+def shutdown():
+    """Export the pending spans"""
+    global _provider
+    if _provider:
+        _provider.shutdown()
+        _provider = None
+
+
+class TraceIdLogFilter(logging.Filter):
+    """Adds the X-Ray trace id of the current request to its log records"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        context = trace.get_current_span().get_span_context()
+        if context.is_valid:
+            record.trace_id = xray_id(context.trace_id)
+        return True
+
+
+def exclude_paths(paths: tuple):
+    """`exclude` of FastAPI(telemetry=...): no span for these paths"""
+    paths = frozenset(paths)
+    return lambda scope: scope.get("path") in paths
+
+
+class TracingMiddleware:
+    """Pure ASGI middleware: ALB trace id and admission queue on the server span"""
+
+    def __init__(self, app):
+        self.app = app
+        self.tracer = trace.get_tracer(__name__)
+
+    async def __call__(self, scope, receive, send):
+        span = trace.get_current_span()
+        if scope["type"] != "http" or not span.is_recording():
+            await self.app(scope, receive, send)
+            return
+
+        for key, value in scope["headers"]:
+            if key == b"x-amzn-trace-id":
+                span.set_attribute("aws.alb.trace_id", value.decode("latin-1"))
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            # Set by AdmissionMiddleware when the request waited for a slot
+            queued = scope.get("admission.queued")
+            if queued:
+                start_ns, end_ns, rejection = queued
+                child = self.tracer.start_span("admission.queue", start_time=start_ns)
+                if rejection:
+                    child.set_attribute("admission.rejected", rejection)
+                child.end(end_time=end_ns)
@@ -6,13 +6,31 @@ from aws_cdk import aws_route53 as route53
 from aws_cdk import aws_route53_targets as targets
 from constructs import Construct
 from aws_cdk.lambda_layer_kubectl_v32 import KubectlV32Layer
-from aws_cdk import Duration
+from aws_cdk import Duration, Size
 import json
 
+from my_fastapi_eks.common.dns_cache import add_dns_cache
+from my_fastapi_eks.common.log_shipping import add_fluent_bit
+from my_fastapi_eks.common.manifest_bundle import ManifestBundle
+from my_fastapi_eks.common.metrics_server import add_metrics_server
+from my_fastapi_eks.common.node_tuning import NodeTuningProfile
+from my_fastapi_eks.common.otel_collector import TraceSampling, add_otel_collector
+from my_fastapi_eks.common.prescaling import add_keda
+from my_fastapi_eks.common.right_sizing import add_vpa_recommender
+from my_fastapi_eks.common.workload_tiers import priority_classes
+
 
 class EksClassicClusterStack(Stack):
 
-    def __init__(self, scope: Construct, construct_id: str, **kwargs) -> None:
+    def __init__(self,
+                 scope: Construct,
+                 construct_id: str,
+                 node_tuning: NodeTuningProfile = None,
+                 kubectl_memory: Size = Size.gibibytes(2),
+                 right_sizing: bool = False,
+                 # None: no collector, the app does not trace
+                 trace_sampling: TraceSampling = TraceSampling(),
+                 **kwargs) -> None:
         super().__init__(scope, construct_id, **kwargs)
 
         # 1. VPC
@@ -24,7 +42,10 @@ class EksClassicClusterStack(Stack):
             version=eks.KubernetesVersion.V1_32,
             vpc=vpc,
             kubectl_layer=KubectlV32Layer(self, "KubectlLayer"),
-            default_capacity=1,
+            # More memory = more vCPU for the kubectl/helm Lambda
+            kubectl_memory=kubectl_memory,
+            # A tuned node group needs its own launch template (see below)
+            default_capacity=0 if node_tuning else 1,
             default_capacity_instance=ec2.InstanceType("m5.xlarge"),
             cluster_logging=[
                 eks.ClusterLoggingTypes.API,
@@ -35,6 +56,26 @@ class EksClassicClusterStack(Stack):
             ]
         )
 
+        if node_tuning:
+            tuned_launch_template = ec2.LaunchTemplate(
+                self, "TunedNodeLaunchTemplate",
+                user_data=ec2.UserData.custom(node_tuning.al2023_user_data())
+            )
+            cluster.add_nodegroup_capacity(
+                "TunedNodeGroup",
+                ami_type=eks.NodegroupAmiType.AL2023_X86_64_STANDARD,
+                instance_types=[ec2.InstanceType("m5.xlarge")],
+                min_size=1,
+                desired_size=1,
+                launch_template_spec=eks.LaunchTemplateSpec(
+                    id=tuned_launch_template.launch_template_id,
+                    version=tuned_launch_template.latest_version_number
+                ),
+                labels={
+                    "fastapi.piercuta.com/node-tuning": node_tuning.name
+                }
+            )
+
         cluster.aws_auth.add_role_mapping(
             iam.Role.from_role_arn(
                 self, "SSOAdminRole",
@@ -44,6 +85,9 @@ class EksClassicClusterStack(Stack):
             username="pcourteille"
         )
 
+        # Add-ons only declare the dependencies they really need (service account,
+        # namespace) so CloudFormation installs the independent charts concurrently.
+        # tools/critical_path.py shows what is left on the critical path.
         alb_sa = cluster.add_service_account(
             "ALBControllerSA",
             name="aws-load-balancer-controller",
@@ -74,10 +118,15 @@ class EksClassicClusterStack(Stack):
                 },
                 "region": self.region,
                 "vpcId": vpc.vpc_id,
-                "replicaCount": 2
+                "replicaCount": 2,
+                # Mutates every new Service and fails closed while the controller starts:
+                # other charts could not be installed concurrently. Not needed without LoadBalancer Services.
+                "enableServiceMutatorWebhook": False
             }
         )
 
+        alb_chart.node.add_dependency(alb_sa)
+
         # 3. CloudWatch Agent
 
         cloudwatch_ns = {
@@ -88,7 +137,6 @@ class EksClassicClusterStack(Stack):
             }
         }
         cloudwatch_namespace = cluster.add_manifest("CloudWatchNamespace", cloudwatch_ns)
-        cloudwatch_namespace.node.add_dependency(alb_chart)
 
         cloudwatch_sa = cluster.add_service_account(
             "CloudWatchAgentSA",
@@ -124,45 +172,40 @@ class EksClassicClusterStack(Stack):
         cloudwatch_chart.node.add_dependency(cloudwatch_sa)
 
         # 4. Metrics Server
-        metrics_server = cluster.add_helm_chart(
-            "MetricsServer",
-            chart="metrics-server",
-            repository="https://kubernetes-sigs.github.io/metrics-server/",
-            namespace="kube-system",
-            values={
-                "args": [
-                    "--kubelet-insecure-tls",  # souvent nécessaire sur EKS
-                    "--kubelet-preferred-address-types=InternalIP"
-                ]
-            }
+        # Existing release name is generated: keep it to avoid a second install
+        metrics_server = add_metrics_server(cluster, release=None)
+
+        # 5. NodeLocal DNS cache + CoreDNS autoscaling
+        dns_charts = add_dns_cache(cluster)
+
+        # 6. KEDA (scheduled / predictive pre-scaling)
+        keda_chart = add_keda(cluster)
+
+        # 7. VPA recommender (right-sizing, see tools/right_size.py)
+        vpa_chart = add_vpa_recommender(cluster) if right_sizing else None
+
+        # 8. PriorityClasses of the workload tiers (pods naming a missing class are rejected)
+        priority_classes_bundle = ManifestBundle(
+            cluster, "PriorityClasses",
+            cluster=cluster,
+            manifests=priority_classes()
         )
 
-        metrics_server.node.add_dependency(cloudwatch_chart)
-
-        # 5. FluentBit
-
-        # cluster.add_helm_chart(
-        #     "FluentBitChart",
-        #     chart="aws-for-fluent-bit",
-        #     release="fluent-bit",
-        #     repository="https://aws.github.io/eks-charts",
-        #     namespace="amazon-cloudwatch",
-        #     values={
-        #         "serviceAccount": {
-        #             "create": False,
-        #             "name": "cloudwatch-agent"
-        #         },
-        #         "cloudWatch": {
-        #             "enabled": True,
-        #             "logGroupName": f"/aws/eks/{cluster.cluster_name}/application",
-        #             "region": "eu-west-1"
-        #         },
-        #         "firehose": {"enabled": False},
-        #         "kinesis": {"enabled": False},
-        #         "elasticsearch": {"enabled": False}
-        #     }
-        # )
+        # 9. Fluent Bit: JSON logs of the pods to CloudWatch, batched (log_shipping.py)
+        fluent_bit_chart = add_fluent_bit(cluster, region=self.region, service_account="cloudwatch-agent")
+        fluent_bit_chart.node.add_dependency(cloudwatch_sa)
+
+        # 10. OpenTelemetry collector: tail sampling, traces to X-Ray (otel_collector.py)
+        otel_collector = add_otel_collector(cluster, region=self.region, sampling=trace_sampling) \
+            if trace_sampling else None
 
         self.eks_cluster = cluster
         self.alb_chart = alb_chart
         self.metrics_server = metrics_server
+        self.dns_charts = dns_charts
+        self.keda_chart = keda_chart
+        self.vpa_chart = vpa_chart
+        self.priority_classes = priority_classes_bundle
+        self.fluent_bit_chart = fluent_bit_chart
+        self.otel_collector = otel_collector
+        self.trace_sampling = trace_sampling
@@ -5,6 +5,17 @@ from aws_cdk import aws_route53_targets as targets
 from aws_cdk import Duration
 from constructs import Construct
 
+from my_fastapi_eks.common.alb_tuning import AlbTuning
+from my_fastapi_eks.common.edge_cache import EdgeCacheOptions, add_edge_cache, origin_lockdown_annotations
+from my_fastapi_eks.common.manifest_bundle import ManifestBundle
+from my_fastapi_eks.common.node_tuning import NodeTuningProfile
+from my_fastapi_eks.common.otel_collector import TraceSampling
+from my_fastapi_eks.common.prescaling import PreScaling
+from my_fastapi_eks.common.right_sizing import vertical_pod_autoscaler
+from my_fastapi_eks.common.service_dns import ServiceDnsOptions, add_service_records
+from my_fastapi_eks.common.topology import TopologySpread
+from my_fastapi_eks.common.workload_tiers import LATENCY_CRITICAL, WorkloadTier
+
 
 class EksClassicFastApiServiceStack(Stack):
 
@@ -14,6 +25,19 @@ class EksClassicFastApiServiceStack(Stack):
                  cluster: eks.Cluster,
                  alb_chart: eks.HelmChart,
                  metric_server: eks.HelmChart,
+                 node_tuning: NodeTuningProfile = None,
+                 alb_tuning: AlbTuning = AlbTuning(),
+                 topology: TopologySpread = TopologySpread(),
+                 tier: WorkloadTier = LATENCY_CRITICAL,
+                 dns: ServiceDnsOptions = ServiceDnsOptions(),
+                 edge_cache: EdgeCacheOptions = None,
+                 pre_scaling: PreScaling = None,
+                 keda_chart: eks.HelmChart = None,
+                 vpa_chart: eks.HelmChart = None,
+                 priority_classes: Construct = None,
+                 # Tracing on, spans to the collector of the cluster stack
+                 trace_sampling: TraceSampling = None,
+                 otel_collector: eks.HelmChart = None,
                  **kwargs) -> None:
         super().__init__(scope, construct_id, **kwargs)
 
@@ -36,6 +60,22 @@ class EksClassicFastApiServiceStack(Stack):
                             "name": "fastapi",
                             "image": image_uri,
                             "ports": [{"containerPort": 8000}],
+                            # Ready as soon as the app answers (no initial delay, 2s period)
+                            "readinessProbe": {
+                                "httpGet": {"path": "/health", "port": 8000},
+                                "periodSeconds": 2,
+                                "failureThreshold": 3
+                            },
+                            "env": alb_tuning.container_env()
+                                   + (trace_sampling.container_env() if trace_sampling else [])
+                                   # /admin/profile/* of the app, only once the Secret exists:
+                                   #   kubectl create secret generic fastapi-profiling --from-literal=token=...
+                                   + [{
+                                       "name": "FASTAPI_PROFILING_TOKEN",
+                                       "valueFrom": {"secretKeyRef": {
+                                           "name": "fastapi-profiling", "key": "token", "optional": True
+                                       }}
+                                   }],
                             "resources": {
                                 "requests": {
                                     "cpu": "100m",
@@ -46,12 +86,21 @@ class EksClassicFastApiServiceStack(Stack):
                                     "memory": "256Mi"
                                 }
                             }
-                        }]
+                        }],
+                        **topology.pod_spec(app_label)
                     }
                 }
             }
         }
 
+        if node_tuning:
+            pod_spec = deployment["spec"]["template"]["spec"]
+            pod_spec["nodeSelector"] = {"fastapi.piercuta.com/node-tuning": node_tuning.name}
+            pod_spec["securityContext"] = {"sysctls": node_tuning.pod_sysctls()}
+
+        # PriorityClass + QoS (Guaranteed: requests raised to the limits)
+        tier.apply(deployment["spec"]["template"]["spec"])
+
         hpa = {
             "apiVersion": "autoscaling/v2",
             "kind": "HorizontalPodAutoscaler",
@@ -88,10 +137,14 @@ class EksClassicFastApiServiceStack(Stack):
             "spec": {
                 "selector": app_label,
                 "ports": [{"port": 80, "targetPort": 8000}],
-                "type": "ClusterIP"
+                "type": "ClusterIP",
+                **topology.service_spec()
             }
         }
 
+        # Only CloudFront may reach the ALB (on 443) when the edge cache is enabled
+        edge_annotations = origin_lockdown_annotations(self, "fastapi-service", edge_cache) if edge_cache else {}
+
         ingress = {
             "apiVersion": "networking.k8s.io/v1",
             "kind": "Ingress",
@@ -102,7 +155,12 @@ class EksClassicFastApiServiceStack(Stack):
                     "alb.ingress.kubernetes.io/target-type": "ip",
                     "alb.ingress.kubernetes.io/listen-ports": '[{"HTTP": 80, "HTTPS": 443}]',
                     "alb.ingress.kubernetes.io/certificate-arn": "arn:aws:acm:eu-west-1:532673134317:certificate/905d0d16-87e8-4e89-a88c-b6053f472e81",
-                    "alb.ingress.kubernetes.io/ssl-redirect": "443"
+                    # HTTPS only behind CloudFront, no HTTP listener to redirect
+                    **({} if edge_cache else {"alb.ingress.kubernetes.io/ssl-redirect": "443"}),
+                    "alb.ingress.kubernetes.io/healthcheck-path": "/health",
+                    **alb_tuning.annotations(),
+                    **dns.ingress_annotations(),
+                    **edge_annotations
                 }
             },
             "spec": {
@@ -129,42 +187,68 @@ class EksClassicFastApiServiceStack(Stack):
             }
         }
 
-        # 4. Apply les manifests
-        # cluster.add_manifest(
-        #     "FastApiDeployment",
-        #     deployment,
-        #     service,
-        #     ingress
-        # )
-
-        fastapi_deployment = cluster.add_manifest("FastApiDeployment", deployment)
-        fastapi_service = cluster.add_manifest("FastApiService", service)
-        fastapi_ingress = cluster.add_manifest("FastApiIngress", ingress)
-        fastapi_hpa = cluster.add_manifest("FastApiHPA", hpa)
-
-        # Ordre logique :
-        fastapi_deployment.node.add_dependency(alb_chart)
-        fastapi_deployment.node.add_dependency(metric_server)
-
-        fastapi_service.node.add_dependency(fastapi_deployment)
-        fastapi_hpa.node.add_dependency(fastapi_service)
-        fastapi_ingress.node.add_dependency(fastapi_hpa)
+        # Pre-scaling: KEDA owns the HPA (CPU trigger + cron windows)
+        autoscaler = pre_scaling.scaled_object(hpa) if pre_scaling else hpa
+        if pre_scaling and not keda_chart:
+            raise ValueError("pre_scaling needs the keda_chart of the cluster stack")
+
+        # Right-sizing: recommendation-only VPA, read by tools/right_size.py
+        right_sizing = [vertical_pod_autoscaler(deployment)] if vpa_chart else []
+
+        # 4. Apply les manifests en une seule invocation kubectl
+        # (scope = cluster, comme cluster.add_manifest)
+        fastapi_manifests = ManifestBundle(
+            cluster, "FastApiManifests",
+            cluster=cluster,
+            manifests=[deployment, service, autoscaler, ingress, *right_sizing],
+            # Ids of the objects before the bundle: retained for one release (manifest_bundle.py)
+            legacy_ids={
+                "FastApiDeployment": deployment,
+                "FastApiService": service,
+                "FastApiIngress": ingress,
+                # pre_scaling: the bundle applies the ScaledObject first, KEDA adopts the
+                # HPA of the same name (transfer-hpa-ownership, prescaling.py)
+                "FastApiHPA": autoscaler,
+            }
+        )
 
-        # 5. A Record pointant vers l'ALB
+        # ALB controller webhooks validate the Ingress, metrics-server feeds the HPA
+        fastapi_manifests.node.add_dependency(alb_chart)
+        fastapi_manifests.node.add_dependency(metric_server)
+        if keda_chart:
+            fastapi_manifests.node.add_dependency(keda_chart)
+        if vpa_chart:
+            fastapi_manifests.node.add_dependency(vpa_chart)
+        if otel_collector:
+            fastapi_manifests.node.add_dependency(otel_collector)
+        if priority_classes:
+            fastapi_manifests.node.add_dependency(priority_classes)
+
+        # 5. Records DNS pointant vers l'ALB
         hosted_zone = route53.HostedZone.from_lookup(
             self, "HostedZone",
             domain_name="piercuta.com"
         )
 
-        recort_set = route53.CnameRecord(
-            self, "FastApiCnameRecord",
+        records = add_service_records(
+            self, cluster,
             zone=hosted_zone,
             record_name="classic-eks-fastapi",
-            domain_name=cluster.get_ingress_load_balancer_address(
-                ingress_name="fastapi-ingress",
-                namespace="default"
-            ),
-            ttl=Duration.minutes(5)
+            ingress_name="fastapi-ingress",
+            namespace="default",
+            options=dns
         )
 
-        recort_set.node.add_dependency(fastapi_ingress)
+        for record in records:
+            record.node.add_dependency(fastapi_manifests)
+
+        # 6. CloudFront devant l'ALB
+        if edge_cache:
+            distribution = add_edge_cache(
+                self,
+                origin_domain_name="classic-eks-fastapi.piercuta.com",
+                zone=hosted_zone,
+                options=edge_cache
+            )
+            for record in records:
+                distribution.node.add_dependency(record)
@@ -0,0 +1,66 @@
+"""ALB load balancer and target group tuning rendered as Ingress annotations.
+
+Load balancer attributes of an IngressGroup are shared: every Ingress joining
+the same ``group_name`` must render the same ``load-balancer-attributes``.
+"""
+from dataclasses import dataclass
+
+
+ALGORITHMS = ("round_robin", "least_outstanding_requests", "weighted_random")
+
+
+@dataclass(frozen=True)
+class AlbTuning:
+    load_balancing_algorithm: str = "least_outstanding_requests"
+    # Ramp-up of new targets, 30-900s, 0 disables. Only with round_robin.
+    slow_start_seconds: int = 0
+    deregistration_delay_seconds: int = 30
+    # False keeps ALB -> pod traffic in the zone of the ALB node, needs replicas in every zone
+    cross_zone: bool = True
+    idle_timeout_seconds: int = 60
+    http2: bool = True
+    client_keep_alive_seconds: int = 3600
+    group_name: str | None = None
+    group_order: int | None = None
+
+    def __post_init__(self):
+        if self.load_balancing_algorithm not in ALGORITHMS:
+            raise ValueError(f"Unknown ALB algorithm {self.load_balancing_algorithm!r}, expected one of {ALGORITHMS}")
+        if self.slow_start_seconds and self.load_balancing_algorithm != "round_robin":
+            raise ValueError("ALB slow start is only supported with the round_robin algorithm")
+        if self.slow_start_seconds and not 30 <= self.slow_start_seconds <= 900:
+            raise ValueError("ALB slow start duration must be between 30 and 900 seconds")
+
+    def annotations(self) -> dict:
+        target_group_attributes = {
+            "load_balancing.algorithm.type": self.load_balancing_algorithm,
+            "deregistration_delay.timeout_seconds": self.deregistration_delay_seconds,
+        }
+        if self.slow_start_seconds:
+            target_group_attributes["slow_start.duration_seconds"] = self.slow_start_seconds
+        if not self.cross_zone:
+            target_group_attributes["load_balancing.cross_zone.enabled"] = "false"
+
+        load_balancer_attributes = {
+            "idle_timeout.timeout_seconds": self.idle_timeout_seconds,
+            "routing.http2.enabled": str(self.http2).lower(),
+            "client_keep_alive.seconds": self.client_keep_alive_seconds,
+        }
+
+        annotations = {
+            "alb.ingress.kubernetes.io/target-group-attributes": _attributes(target_group_attributes),
+            "alb.ingress.kubernetes.io/load-balancer-attributes": _attributes(load_balancer_attributes),
+        }
+        if self.group_name:
+            annotations["alb.ingress.kubernetes.io/group.name"] = self.group_name
+        if self.group_order is not None:
+            annotations["alb.ingress.kubernetes.io/group.order"] = str(self.group_order)
+        return annotations
+
+    def container_env(self) -> list:
+        """uvicorn must keep connections open longer than the ALB, otherwise the ALB reuses closed ones (502)"""
+        return [{"name": "UVICORN_TIMEOUT_KEEP_ALIVE", "value": str(self.idle_timeout_seconds + 5)}]
+
+
+def _attributes(attributes: dict) -> str:
+    return ",".join(f"{key}={value}" for key, value in attributes.items())
@@ -0,0 +1,79 @@
+"""NodeLocal DNSCache and proportional CoreDNS autoscaling add-on.
+
+NodeLocal DNSCache runs as a DaemonSet in iptables mode: it binds both the
+link-local address and the kube-dns ClusterIP on every node, so pods keep
+their default resolv.conf and no kubelet ``clusterDNS`` change is needed.
+DaemonSets do not run on Fargate, there only CoreDNS autoscaling is deployed.
+"""
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class DnsCacheOptions:
+    node_local_dns: bool = True
+    local_dns_ip: str = "169.254.20.10"
+    # EKS picks 172.20.0.0/16 as service CIDR when the VPC is in 10.0.0.0/8
+    kube_dns_ip: str = "172.20.0.10"
+    cores_per_replica: int = 256
+    nodes_per_replica: int = 16
+    min_replicas: int = 2
+    max_replicas: int = 10
+
+
+def add_dns_cache(cluster, options: DnsCacheOptions = DnsCacheOptions(), fargate: bool = False) -> list:
+    """Install the DNS add-on charts on `cluster` and return them"""
+    charts = [
+        cluster.add_helm_chart(
+            "CoreDnsAutoscaler",
+            chart="cluster-proportional-autoscaler",
+            repository="https://kubernetes-sigs.github.io/cluster-proportional-autoscaler",
+            release="coredns-autoscaler",
+            namespace="kube-system",
+            values={
+                "nameOverride": "coredns-autoscaler",
+                "options": {
+                    "target": "deployment/coredns",
+                    "namespace": "kube-system"
+                },
+                "config": {
+                    "linear": {
+                        "coresPerReplica": options.cores_per_replica,
+                        # On Fargate every pod is a node: this is the effective knob
+                        "nodesPerReplica": options.nodes_per_replica,
+                        "min": options.min_replicas,
+                        "max": options.max_replicas,
+                        "preventSinglePointFailure": True,
+                        "includeUnschedulableNodes": True
+                    }
+                },
+                "resources": {
+                    "requests": {"cpu": "20m", "memory": "32Mi"},
+                    "limits": {"memory": "64Mi"}
+                }
+            }
+        )
+    ]
+
+    if options.node_local_dns and not fargate:
+        charts.append(cluster.add_helm_chart(
+            "NodeLocalDns",
+            chart="node-local-dns",
+            repository="https://charts.deliveryhero.io/",
+            release="node-local-dns",
+            namespace="kube-system",
+            values={
+                "config": {
+                    "localDns": options.local_dns_ip,
+                    "dnsServer": options.kube_dns_ip,
+                    "dnsDomain": "cluster.local",
+                    "setupInterface": True,
+                    "setupIptables": True
+                },
+                "resources": {
+                    "requests": {"cpu": "25m", "memory": "30Mi"},
+                    "limits": {"memory": "128Mi"}
+                }
+            }
+        ))
+
+    return charts
@@ -0,0 +1,127 @@
+"""Optional CloudFront distribution in front of the Ingress ALB.
+
+Nothing is cached unless the app says so: the cache policy has a default TTL
+of 0 and follows the origin ``Cache-Control`` (``max-age``/``s-maxage``).
+The origin is the service record (it matches the ALB certificate); the ALB
+is locked down to the CloudFront origin-facing prefix list and, when a secret
+is given, to requests carrying the origin secret header. CloudFront reaches
+the origin over HTTPS only, so the ALB only listens on 443: the controller
+adds one security group rule per listener port for the prefix list, each
+counting as the list's max entries (~55) against the 60 inbound rules quota.
+"""
+from dataclasses import dataclass
+import json
+
+from aws_cdk import Duration, Stack
+from aws_cdk import aws_certificatemanager as acm
+from aws_cdk import aws_cloudfront as cloudfront
+from aws_cdk import aws_cloudfront_origins as origins
+from aws_cdk import aws_ec2 as ec2
+from aws_cdk import aws_route53 as route53
+from aws_cdk import aws_route53_targets as targets
+from constructs import Construct
+
+
+ORIGIN_SECRET_HEADER = "X-Origin-Verify"
+CLOUDFRONT_PREFIX_LIST = "com.amazonaws.global.cloudfront.origin-facing"
+
+
+@dataclass(frozen=True)
+class EdgeCacheOptions:
+    # Public name of the distribution (needs a us-east-1 certificate), None keeps *.cloudfront.net
+    record_name: str | None = None
+    certificate_arn: str | None = None
+    origin_secret: str | None = None
+    origin_shield: bool = True
+    max_ttl: Duration = Duration.days(1)
+    price_class: cloudfront.PriceClass = cloudfront.PriceClass.PRICE_CLASS_ALL
+
+    def __post_init__(self):
+        if bool(self.record_name) != bool(self.certificate_arn):
+            raise ValueError("record_name and certificate_arn go together")
+
+
+def origin_lockdown_annotations(scope: Construct, service_name: str, options: EdgeCacheOptions) -> dict:
+    """Ingress annotations restricting the ALB to CloudFront, merged last (they override listen-ports).
+
+    The Ingress must not set ``ssl-redirect``: there is no HTTP listener to redirect.
+    """
+    prefix_list = ec2.PrefixList.from_lookup(
+        scope, "CloudFrontOriginFacing",
+        prefix_list_name=CLOUDFRONT_PREFIX_LIST
+    )
+    annotations = {
+        "alb.ingress.kubernetes.io/listen-ports": '[{"HTTPS": 443}]',
+        "alb.ingress.kubernetes.io/security-group-prefix-lists": prefix_list.prefix_list_id
+    }
+    if options.origin_secret:
+        annotations[f"alb.ingress.kubernetes.io/conditions.{service_name}"] = json.dumps([{
+            "field": "http-header",
+            "httpHeaderConfig": {
+                "httpHeaderName": ORIGIN_SECRET_HEADER,
+                "values": [options.origin_secret]
+            }
+        }])
+    return annotations
+
+
+def add_edge_cache(
+        scope: Construct,
+        origin_domain_name: str,
+        zone: route53.IHostedZone,
+        options: EdgeCacheOptions) -> cloudfront.Distribution:
+    """Create the distribution (and its alias record) in front of `origin_domain_name`"""
+    origin = origins.HttpOrigin(
+        origin_domain_name,
+        protocol_policy=cloudfront.OriginProtocolPolicy.HTTPS_ONLY,
+        custom_headers={ORIGIN_SECRET_HEADER: options.origin_secret} if options.origin_secret else None,
+        origin_shield_enabled=options.origin_shield,
+        origin_shield_region=Stack.of(scope).region if options.origin_shield else None,
+        keepalive_timeout=Duration.seconds(60)
+    )
+
+    cache_policy = cloudfront.CachePolicy(
+        scope, "EdgeCachePolicy",
+        comment="Honour origin Cache-Control, cache nothing by default",
+        default_ttl=Duration.seconds(0),
+        min_ttl=Duration.seconds(0),
+        max_ttl=options.max_ttl,
+        query_string_behavior=cloudfront.CacheQueryStringBehavior.all(),
+        header_behavior=cloudfront.CacheHeaderBehavior.none(),
+        cookie_behavior=cloudfront.CacheCookieBehavior.none(),
+        enable_accept_encoding_gzip=True,
+        enable_accept_encoding_brotli=True
+    )
+
+    domain_options = {}
+    if options.record_name:
+        domain_options["domain_names"] = [f"{options.record_name}.{zone.zone_name}"]
+        domain_options["certificate"] = acm.Certificate.from_certificate_arn(
+            scope, "EdgeCertificate", options.certificate_arn
+        )
+
+    distribution = cloudfront.Distribution(
+        scope, "EdgeDistribution",
+        default_behavior=cloudfront.BehaviorOptions(
+            origin=origin,
+            viewer_protocol_policy=cloudfront.ViewerProtocolPolicy.REDIRECT_TO_HTTPS,
+            allowed_methods=cloudfront.AllowedMethods.ALLOW_ALL,
+            cached_methods=cloudfront.CachedMethods.CACHE_GET_HEAD,
+            cache_policy=cache_policy,
+            origin_request_policy=cloudfront.OriginRequestPolicy.ALL_VIEWER_EXCEPT_HOST_HEADER,
+            compress=True
+        ),
+        http_version=cloudfront.HttpVersion.HTTP2_AND_3,
+        price_class=options.price_class,
+        **domain_options
+    )
+
+    if options.record_name:
+        route53.ARecord(
+            scope, "EdgeAliasRecord",
+            zone=zone,
+            record_name=options.record_name,
+            target=route53.RecordTarget.from_alias(targets.CloudFrontTarget(distribution))
+        )
+
+    return distribution
@@ -0,0 +1,126 @@
+"""Shipping of the container logs to CloudWatch Logs.
+
+The app writes JSON lines on stdout (fastapi_app/logging_setup.py). On EC2
+nodes Fluent Bit (DaemonSet) tails them, merges the JSON into the record
+(queryable fields in Logs Insights) and sends them in batches: one
+PutLogEvents per stream and flush interval, instead of a call per line.
+Chunks are buffered on the node filesystem, so a slow CloudWatch never
+back-pressures the tail of a busy node. On Fargate the same output runs in the
+built-in log router, configured by the ``aws-logging`` ConfigMap.
+"""
+
+APPLICATION_LOG_GROUP = "/aws/eks/{cluster_name}/application"
+
+# Seconds between two flushes: the batch size of PutLogEvents
+FLUSH_SECONDS = 5
+LOG_RETENTION_DAYS = 14
+
+
+def add_fluent_bit(cluster, region: str, service_account: str, namespace: str = "amazon-cloudwatch",
+                   log_group: str = None):
+    """Install the aws-for-fluent-bit DaemonSet on `cluster`, return the chart.
+
+    `service_account` must exist in `namespace` with the logs permissions
+    (policy/cloudwatch-logs-policy.json).
+    """
+    return cluster.add_helm_chart(
+        "FluentBitChart",
+        chart="aws-for-fluent-bit",
+        release="fluent-bit",
+        repository="https://aws.github.io/eks-charts",
+        namespace=namespace,
+        values={
+            "serviceAccount": {
+                "create": False,
+                "name": service_account
+            },
+            "service": {
+                "extraService": "\n".join([
+                    f"Flush {FLUSH_SECONDS}",
+                    "storage.path /var/fluent-bit/state/flb-storage/",
+                    "storage.sync normal",
+                    "storage.backlog.mem_limit 5M",
+                ])
+            },
+            "input": {
+                "memBufLimit": "50MB",
+                "skipLongLines": "On",
+                "refreshInterval": 10,
+                "extraInputs": "storage.type filesystem"
+            },
+            "filter": {
+                # JSON lines of the app become fields, the raw line is not kept twice
+                "mergeLog": "On",
+                "mergeLogKey": "log_processed",
+                "keepLog": "Off",
+                # fluentbit.io/exclude: "true" on a pod opts it out
+                "k8sLoggingExclude": "On"
+            },
+            "cloudWatchLogs": {
+                "enabled": True,
+                "region": region,
+                "logGroupName": log_group or APPLICATION_LOG_GROUP.format(cluster_name=cluster.cluster_name),
+                "logStreamPrefix": "fluent-bit-",
+                "autoCreateGroup": True,
+                "logRetentionDays": LOG_RETENTION_DAYS
+            },
+            # Legacy Go plugin and the other outputs
+            "cloudWatch": {"enabled": False},
+            "firehose": {"enabled": False},
+            "kinesis": {"enabled": False},
+            "elasticsearch": {"enabled": False}
+        }
+    )
+
+
+def fargate_log_router(region: str, log_group: str) -> list:
+    """Manifests configuring the built-in Fluent Bit of Fargate pods.
+
+    The pod execution roles of the profiles need the logs permissions.
+    """
+    namespace = {
+        "apiVersion": "v1",
+        "kind": "Namespace",
+        "metadata": {
+            "name": "aws-observability",
+            "labels": {"aws-observability": "enabled"}
+        }
+    }
+    config = {
+        "apiVersion": "v1",
+        "kind": "ConfigMap",
+        "metadata": {
+            "name": "aws-logging",
+            "namespace": "aws-observability"
+        },
+        "data": {
+            # Logs of the router itself stay off (one log stream per pod otherwise)
+            "flb_log_cw": "false",
+            "filters.conf": "\n".join([
+                "[FILTER]",
+                "    Name parser",
+                "    Match *",
+                "    Key_Name log",
+                "    Parser json",
+                "    Reserve_Data On",
+            ]) + "\n",
+            "parsers.conf": "\n".join([
+                "[PARSER]",
+                "    Name json",
+                "    Format json",
+                "    Time_Key time",
+                "    Time_Format %Y-%m-%dT%H:%M:%S.%LZ",
+            ]) + "\n",
+            "output.conf": "\n".join([
+                "[OUTPUT]",
+                "    Name cloudwatch_logs",
+                "    Match *",
+                f"    region {region}",
+                f"    log_group_name {log_group}",
+                "    log_stream_prefix fargate-",
+                "    auto_create_group true",
+                f"    log_retention_days {LOG_RETENTION_DAYS}",
+            ]) + "\n"
+        }
+    }
+    return [namespace, config]
@@ -0,0 +1,84 @@
+"""Group related Kubernetes objects in a single kubectl custom resource.
+
+Every ``cluster.add_manifest`` is one invocation of the kubectl Lambda (cold
+start, ``aws eks update-kubeconfig``, ``kubectl apply``). A bundle applies all
+its objects in one invocation, sorted so that namespaces and CRDs come before
+the objects that need them.
+
+Migration from one ``cluster.add_manifest`` per object: removing such a
+custom resource from the stack makes the kubectl handler ``kubectl delete``
+its objects (a namespace with everything in it). ``legacy_ids`` keeps the
+old custom resources for one release, same logical ids, now with the
+DeletionPolicy ``Retain`` and applying the same objects as the bundle. Once
+that release is deployed everywhere, drop ``legacy_ids``: CloudFormation
+forgets the old resources without calling the handler, the objects stay,
+owned by the bundle.
+"""
+import copy
+
+from aws_cdk import RemovalPolicy
+from aws_cdk import aws_eks as eks
+from aws_cdk import aws_eks_v2_alpha as eks_alpha
+from constructs import Construct
+
+
+# Same idea as Helm's install order
+KIND_ORDER = [
+    "Namespace",
+    "CustomResourceDefinition",
+    "PriorityClass",
+    "ResourceQuota",
+    "LimitRange",
+    "ServiceAccount",
+    "Secret",
+    "ConfigMap",
+    "ClusterRole",
+    "ClusterRoleBinding",
+    "Role",
+    "RoleBinding",
+    "Service",
+    "DaemonSet",
+    "Deployment",
+    "StatefulSet",
+    "Job",
+    "CronJob",
+    "HorizontalPodAutoscaler",
+    "PodDisruptionBudget",
+    "Ingress",
+]
+
+
+def kind_rank(manifest: dict) -> int:
+    kind = manifest.get("kind")
+    # Unknown kinds (custom resources) last, once their CRD exists
+    return KIND_ORDER.index(kind) if kind in KIND_ORDER else len(KIND_ORDER)
+
+
+class ManifestBundle(Construct):
+
+    def __init__(self, scope: Construct, construct_id: str, cluster, manifests: list,
+                 legacy_ids: dict = None, **kwargs) -> None:
+        super().__init__(scope, construct_id)
+
+        # sorted() is stable: objects of the same kind keep the caller order
+        self.manifests = sorted(manifests, key=kind_rank)
+
+        manifest_type = eks_alpha.KubernetesManifest if isinstance(cluster, eks_alpha.Cluster) else eks.KubernetesManifest
+        self.resource = manifest_type(
+            self, "Resource",
+            cluster=cluster,
+            manifest=self.manifests,
+            # `kubectl apply` instead of `kubectl create`: re-applying the bundle is idempotent
+            overwrite=True,
+            **kwargs
+        )
+
+        # {id given to cluster.add_manifest before the bundle: manifest}, see the module docstring
+        self.legacy = []
+        for legacy_id, manifest in (legacy_ids or {}).items():
+            # Own copy: the construct adds its prune label to the manifest
+            legacy = cluster.add_manifest(legacy_id, copy.deepcopy(manifest))
+            legacy.node.default_child.apply_removal_policy(RemovalPolicy.RETAIN)
+            # Re-applied (if changed) after the bundle, never deleted
+            legacy.node.add_dependency(self.resource)
+            self.legacy.append(legacy)
@@ -0,0 +1,179 @@
+"""Kubelet and kernel tuning profiles for EKS worker nodes.
+
+A profile renders the same settings for every place a node can come from:
+the ``kubelet`` block of a Karpenter ``EC2NodeClass``, Bottlerocket TOML user
+data and AL2023 ``nodeadm`` user data (used by managed node groups through a
+launch template).
+"""
+from dataclasses import dataclass, field
+import json
+
+import yaml
+
+
+MIME_BOUNDARY = "//"
+
+
+@dataclass(frozen=True)
+class NodeTuningProfile:
+    name: str
+    kube_reserved: dict
+    system_reserved: dict
+    eviction_hard: dict
+    cpu_manager_policy: str = "none"
+    image_gc_high_threshold_percent: int = 85
+    image_gc_low_threshold_percent: int = 80
+    max_pods: int | None = None
+    # Node level (host network namespace) sysctls
+    sysctls: dict = field(default_factory=dict)
+    # Pods get their own network namespace: listen backlog of the FastAPI
+    # socket is bounded by the pod value of net.core.somaxconn, not the node one.
+    pod_sysctl_values: dict = field(default_factory=dict)
+    allowed_unsafe_sysctls: tuple = ("net.core.somaxconn",)
+
+    def karpenter_kubelet(self) -> dict:
+        """`spec.kubelet` of a Karpenter v1 EC2NodeClass"""
+        kubelet = {
+            "kubeReserved": dict(self.kube_reserved),
+            "systemReserved": dict(self.system_reserved),
+            "evictionHard": dict(self.eviction_hard),
+            "imageGCHighThresholdPercent": self.image_gc_high_threshold_percent,
+            "imageGCLowThresholdPercent": self.image_gc_low_threshold_percent,
+        }
+        if self.max_pods:
+            kubelet["maxPods"] = self.max_pods
+        return kubelet
+
+    def kubelet_configuration(self) -> dict:
+        """KubeletConfiguration fields, including the ones Karpenter does not expose"""
+        config = self.karpenter_kubelet()
+        config["cpuManagerPolicy"] = self.cpu_manager_policy
+        if self.cpu_manager_policy == "static":
+            config["cpuManagerReconcilePeriod"] = "5s"
+        if self.allowed_unsafe_sysctls:
+            config["allowedUnsafeSysctls"] = list(self.allowed_unsafe_sysctls)
+        return config
+
+    def bottlerocket_user_data(self) -> str:
+        """Bottlerocket settings TOML (merged by Karpenter with its own settings)"""
+        kubernetes = {
+            "cpu-manager-policy": self.cpu_manager_policy,
+            "image-gc-high-threshold-percent": self.image_gc_high_threshold_percent,
+            "image-gc-low-threshold-percent": self.image_gc_low_threshold_percent,
+        }
+        if self.allowed_unsafe_sysctls:
+            kubernetes["allowed-unsafe-sysctls"] = list(self.allowed_unsafe_sysctls)
+        if self.max_pods:
+            kubernetes["max-pods"] = self.max_pods
+
+        tables = [
+            ("settings.kubernetes", kubernetes),
+            ("settings.kubernetes.kube-reserved", self.kube_reserved),
+            ("settings.kubernetes.system-reserved", self.system_reserved),
+            ("settings.kubernetes.eviction-hard", self.eviction_hard),
+            ("settings.kernel.sysctl", {k: str(v) for k, v in self.sysctls.items()}),
+        ]
+        return "\n\n".join(_toml_table(name, values) for name, values in tables if values) + "\n"
+
+    def al2023_user_data(self) -> str:
+        """MIME multi-part user data: nodeadm NodeConfig + sysctl script"""
+        node_config = {
+            "apiVersion": "node.eks.aws/v1alpha1",
+            "kind": "NodeConfig",
+            "spec": {
+                "kubelet": {
+                    "config": self.kubelet_configuration()
+                }
+            }
+        }
+        sysctl_conf = "\n".join(f"{key} = {value}" for key, value in self.sysctls.items())
+        script = (
+            "#!/bin/bash\n"
+            f"cat <<'EOF' > /etc/sysctl.d/90-{self.name}.conf\n"
+            f"{sysctl_conf}\n"
+            "EOF\n"
+            "sysctl --system\n"
+        )
+        return (
+            "MIME-Version: 1.0\n"
+            f'Content-Type: multipart/mixed; boundary="{MIME_BOUNDARY}"\n'
+            "\n"
+            f"--{MIME_BOUNDARY}\n"
+            "Content-Type: application/node.eks.aws\n"
+            "\n"
+            f"{yaml.safe_dump(node_config, sort_keys=False)}"
+            f"--{MIME_BOUNDARY}\n"
+            'Content-Type: text/x-shellscript; charset="us-ascii"\n'
+            "\n"
+            f"{script}"
+            f"--{MIME_BOUNDARY}--\n"
+        )
+
+    def pod_sysctls(self) -> list:
+        """`securityContext.sysctls` entries for pods scheduled on tuned nodes"""
+        return [{"name": key, "value": str(value)} for key, value in self.pod_sysctl_values.items()]
+
+
+def _toml_table(name: str, values: dict) -> str:
+    lines = [f"[{name}]"]
+    for key, value in values.items():
+        # json.dumps gives valid TOML for strings, ints and string arrays
+        lines.append(f"{json.dumps(key) if '.' in key else key} = {json.dumps(value)}")
+    return "\n".join(lines)
+
+
+_CONNECTION_SYSCTLS = {
+    "net.core.somaxconn": 65535,
+    "net.core.netdev_max_backlog": 16384,
+    "net.ipv4.tcp_max_syn_backlog": 65535,
+    "net.ipv4.ip_local_port_range": "1024 65535",
+    "net.ipv4.tcp_tw_reuse": 1,
+    "net.ipv4.tcp_fin_timeout": 15,
+}
+
+# Latency: static CPU manager gives exclusive cores to Guaranteed pods with
+# integer CPU requests, no slow start after idle on ALB keep-alive connections,
+# images kept longer on disk so scale-out does not re-pull them.
+LATENCY = NodeTuningProfile(
+    name="latency",
+    kube_reserved={"cpu": "200m", "memory": "512Mi", "ephemeral-storage": "1Gi"},
+    system_reserved={"cpu": "100m", "memory": "256Mi", "ephemeral-storage": "1Gi"},
+    eviction_hard={"memory.available": "200Mi", "nodefs.available": "10%"},
+    cpu_manager_policy="static",
+    image_gc_high_threshold_percent=90,
+    image_gc_low_threshold_percent=80,
+    sysctls={
+        **_CONNECTION_SYSCTLS,
+        "net.ipv4.tcp_slow_start_after_idle": 0,
+    },
+    pod_sysctl_values={
+        "net.core.somaxconn": 65535,
+        "net.ipv4.ip_local_port_range": "1024 65535",
+        "net.ipv4.tcp_fin_timeout": 15,
+    },
+)
+
+# Throughput: shared CPU pool for denser bin-packing, bigger socket buffers.
+THROUGHPUT = NodeTuningProfile(
+    name="throughput",
+    kube_reserved={"cpu": "100m", "memory": "512Mi", "ephemeral-storage": "1Gi"},
+    system_reserved={"cpu": "100m", "memory": "256Mi", "ephemeral-storage": "1Gi"},
+    eviction_hard={"memory.available": "100Mi", "nodefs.available": "10%"},
+    cpu_manager_policy="none",
+    image_gc_high_threshold_percent=85,
+    image_gc_low_threshold_percent=75,
+    max_pods=110,
+    sysctls={
+        **_CONNECTION_SYSCTLS,
+        "net.core.rmem_max": 16777216,
+        "net.core.wmem_max": 16777216,
+        "net.ipv4.tcp_rmem": "4096 87380 16777216",
+        "net.ipv4.tcp_wmem": "4096 65536 16777216",
+    },
+    pod_sysctl_values={
+        "net.core.somaxconn": 65535,
+        "net.ipv4.ip_local_port_range": "1024 65535",
+    },
+)
+
+PROFILES = {profile.name: profile for profile in (LATENCY, THROUGHPUT)}
@@ -0,0 +1,120 @@
+"""OpenTelemetry collector: tail sampling and batched export of the traces to X-Ray.
+
+The app samples at the head (``head_ratio`` of the new traces, see
+fastapi_app/tracing.py) and sends its spans over OTLP/HTTP to the collector
+Service. The collector waits ``decision_wait_seconds`` for the spans of a
+trace, then keeps it if it failed, was slower than ``slow_ms``, or falls in
+the ``baseline_percent``: the traces worth looking at survive a low export
+volume. Exports to X-Ray are batched.
+
+Tail sampling needs every span of a trace in the same collector: one replica
+(the traces of the app do not span several pods' collectors). Scaling it out
+means a load-balancing tier routing by trace id in front.
+
+The collector complements the ``aws-cloudwatch-metrics`` agent, which keeps
+the node and pod metrics (Container Insights).
+"""
+from dataclasses import dataclass
+
+from aws_cdk import aws_iam as iam
+
+
+NAMESPACE = "opentelemetry"
+OTLP_ENDPOINT = f"http://otel-collector.{NAMESPACE}.svc.cluster.local:4318"
+
+
+@dataclass(frozen=True)
+class TraceSampling:
+    # Head: share of the new traces the app records (callers' decisions are kept)
+    head_ratio: float = 1.0
+    # Tail: errors and slow traces are always kept, plus a baseline of the rest
+    slow_ms: int = 500
+    baseline_percent: float = 10
+    decision_wait_seconds: int = 10
+
+    def container_env(self) -> list:
+        """Env of the app container: tracing on, spans to the collector"""
+        return [
+            {"name": "FASTAPI_TRACING", "value": "1"},
+            {"name": "FASTAPI_TRACE_SAMPLE_RATIO", "value": str(self.head_ratio)},
+            {"name": "OTEL_EXPORTER_OTLP_ENDPOINT", "value": OTLP_ENDPOINT},
+            {"name": "POD_NAME", "valueFrom": {"fieldRef": {"fieldPath": "metadata.name"}}},
+            {"name": "POD_NAMESPACE", "valueFrom": {"fieldRef": {"fieldPath": "metadata.namespace"}}},
+            {"name": "OTEL_RESOURCE_ATTRIBUTES", "value": "k8s.pod.name=$(POD_NAME),k8s.namespace.name=$(POD_NAMESPACE)"},
+        ]
+
+    def collector_config(self, region: str) -> dict:
+        return {
+            "receivers": {
+                "otlp": {"protocols": {"http": {"endpoint": "0.0.0.0:4318"}, "grpc": {"endpoint": "0.0.0.0:4317"}}}
+            },
+            "processors": {
+                # Refuse spans (the app drops them) rather than being OOM killed
+                "memory_limiter": {"check_interval": "1s", "limit_percentage": 80, "spike_limit_percentage": 25},
+                "tail_sampling": {
+                    "decision_wait": f"{self.decision_wait_seconds}s",
+                    "num_traces": 50000,
+                    "policies": [
+                        {"name": "errors", "type": "status_code", "status_code": {"status_codes": ["ERROR"]}},
+                        {"name": "slow", "type": "latency", "latency": {"threshold_ms": self.slow_ms}},
+                        {"name": "baseline", "type": "probabilistic",
+                         "probabilistic": {"sampling_percentage": self.baseline_percent}},
+                    ]
+                },
+                "batch": {"send_batch_size": 512, "send_batch_max_size": 1024, "timeout": "5s"}
+            },
+            "exporters": {
+                "awsxray": {"region": region}
+            },
+            "service": {
+                "pipelines": {
+                    "traces": {
+                        "receivers": ["otlp"],
+                        "processors": ["memory_limiter", "tail_sampling", "batch"],
+                        "exporters": ["awsxray"]
+                    },
+                    # Pipelines of the chart defaults: no metrics or logs through the collector
+                    "metrics": None,
+                    "logs": None
+                }
+            }
+        }
+
+
+def add_otel_collector(cluster, region: str, sampling: TraceSampling = TraceSampling()):
+    """Install the collector (namespace, IRSA service account, chart), return the chart"""
+    namespace = cluster.add_manifest("OtelNamespace", {
+        "apiVersion": "v1",
+        "kind": "Namespace",
+        "metadata": {"name": NAMESPACE}
+    })
+    service_account = cluster.add_service_account(
+        "OtelCollectorSA",
+        name="otel-collector",
+        namespace=NAMESPACE
+    )
+    service_account.role.add_managed_policy(iam.ManagedPolicy.from_aws_managed_policy_name("AWSXrayWriteOnlyAccess"))
+    service_account.node.add_dependency(namespace)
+
+    chart = cluster.add_helm_chart(
+        "OtelCollector",
+        chart="opentelemetry-collector",
+        repository="https://open-telemetry.github.io/opentelemetry-helm-charts",
+        release="otel-collector",
+        namespace=NAMESPACE,
+        values={
+            "fullnameOverride": "otel-collector",
+            "mode": "deployment",
+            "replicaCount": 1,
+            # contrib: tail_sampling and awsxray
+            "image": {"repository": "otel/opentelemetry-collector-contrib"},
+            "serviceAccount": {"create": False, "name": "otel-collector"},
+            "resources": {
+                "requests": {"cpu": "100m", "memory": "256Mi"},
+                "limits": {"memory": "512Mi"}
+            },
+            "config": sampling.collector_config(region)
+        }
+    )
+    chart.node.add_dependency(service_account)
+    return chart
@@ -0,0 +1,171 @@
+"""Scheduled and forecast-driven pre-scaling with KEDA.
+
+With pre-scaling the workload gets a KEDA ``ScaledObject`` instead of a bare
+HPA: the CPU trigger keeps the reactive behaviour, each cron window raises
+the replica floor during a known peak. KEDA takes the max of its triggers.
+
+Predictive mode is the same mechanism fed by a forecast: ``forecast_windows``
+turns recorded traffic into windows that start ``lead_minutes`` before the
+forecast load (node launch + image pull), see tools/forecast_schedule.py.
+
+With ``queue_depth_url`` the admission queue of the app (fastapi_app/
+admission.py) is a trigger too: it grows as soon as the pods are saturated,
+before the CPU average reacts. The URL goes through the Service, so each
+poll reads one pod: the target is a per-pod queue depth.
+"""
+from dataclasses import dataclass
+import json
+import math
+
+
+MINUTES_PER_WEEK = 7 * 24 * 60
+
+
+@dataclass(frozen=True)
+class ScheduleWindow:
+    start: str  # cron, e.g. "0 8 * * 1-5"
+    end: str
+    min_replicas: int
+
+
+@dataclass(frozen=True)
+class PreScaling:
+    windows: tuple = ()
+    timezone: str = "Europe/Paris"
+    # e.g. http://fastapi-service.fastapi.svc.cluster.local/metrics/admission
+    queue_depth_url: str | None = None
+    queue_depth_target: int = 5
+
+    @classmethod
+    def from_forecast(cls, path: str, timezone: str = "Europe/Paris") -> "PreScaling":
+        """Load the windows written by tools/forecast_schedule.py"""
+        with open(path) as f:
+            return cls(windows=tuple(ScheduleWindow(**window) for window in json.load(f)), timezone=timezone)
+
+    def scaled_object(self, hpa: dict) -> dict:
+        """KEDA ScaledObject equivalent to `hpa` plus the cron windows"""
+        spec = hpa["spec"]
+        triggers = []
+        for metric in spec["metrics"]:
+            resource = metric["resource"]
+            triggers.append({
+                "type": resource["name"],
+                "metricType": "Utilization",
+                "metadata": {"value": str(resource["target"]["averageUtilization"])}
+            })
+        if self.queue_depth_url:
+            triggers.append({
+                "type": "metrics-api",
+                # Value: desired = replicas * queue depth / target
+                "metricType": "Value",
+                "metadata": {
+                    "url": self.queue_depth_url,
+                    "valueLocation": "queue_depth",
+                    "targetValue": str(self.queue_depth_target)
+                }
+            })
+        for window in self.windows:
+            triggers.append({
+                "type": "cron",
+                "metadata": {
+                    "timezone": self.timezone,
+                    "start": window.start,
+                    "end": window.end,
+                    "desiredReplicas": str(window.min_replicas)
+                }
+            })
+
+        return {
+            "apiVersion": "keda.sh/v1alpha1",
+            "kind": "ScaledObject",
+            "metadata": {
+                "name": hpa["metadata"]["name"].removesuffix("-hpa") + "-scaler",
+                "namespace": hpa["metadata"].get("namespace", "default"),
+                # Adopt the HPA already scaling the target (a deployed service
+                # turning pre-scaling on): the KEDA webhook refuses the
+                # ScaledObject otherwise
+                "annotations": {"scaledobject.keda.sh/transfer-hpa-ownership": "true"}
+            },
+            "spec": {
+                "scaleTargetRef": {"name": spec["scaleTargetRef"]["name"]},
+                "minReplicaCount": spec["minReplicas"],
+                "maxReplicaCount": spec["maxReplicas"],
+                "advanced": {
+                    # KEDA owns the HPA, keep its name for dashboards and alarms
+                    "horizontalPodAutoscalerConfig": {
+                        "name": hpa["metadata"]["name"],
+                        **({"behavior": spec["behavior"]} if "behavior" in spec else {})
+                    }
+                },
+                "triggers": triggers
+            }
+        }
+
+
+def forecast_windows(
+        samples: list,
+        requests_per_pod: float,
+        lead_minutes: int = 10,
+        quantile: float = 0.9,
+        baseline_replicas: int = 1) -> list:
+    """Pre-scaling windows from (datetime, requests per second) samples.
+
+    Load is forecast per weekday and hour as the `quantile` of the samples,
+    hours needing more than `baseline_replicas` become windows starting
+    `lead_minutes` early.
+    """
+    buckets = {}
+    for timestamp, rps in samples:
+        buckets.setdefault((timestamp.weekday(), timestamp.hour), []).append(rps)
+
+    replicas_per_hour = []
+    for hour_of_week in range(7 * 24):
+        values = sorted(buckets.get(divmod(hour_of_week, 24), [0]))
+        forecast = values[min(len(values) - 1, int(quantile * len(values)))]
+        replicas_per_hour.append(max(baseline_replicas, math.ceil(forecast / requests_per_pod)))
+
+    windows = []
+    hour = 0
+    while hour < 7 * 24:
+        replicas = replicas_per_hour[hour]
+        end = hour
+        while end < 7 * 24 and replicas_per_hour[end] == replicas:
+            end += 1
+        if replicas > baseline_replicas:
+            windows.append(ScheduleWindow(
+                start=_cron((hour * 60 - lead_minutes) % MINUTES_PER_WEEK),
+                end=_cron((end * 60) % MINUTES_PER_WEEK),
+                min_replicas=replicas
+            ))
+        hour = end
+    return windows
+
+
+def _cron(minute_of_week: int) -> str:
+    day, minute_of_day = divmod(minute_of_week, 24 * 60)
+    # datetime.weekday(): Monday = 0, cron: Sunday = 0
+    return f"{minute_of_day % 60} {minute_of_day // 60} * * {(day + 1) % 7}"
+
+
+def add_keda(cluster, namespace: str = "keda"):
+    """Install the KEDA operator on `cluster` and return the chart"""
+    return cluster.add_helm_chart(
+        "Keda",
+        chart="keda",
+        repository="https://kedacore.github.io/charts",
+        release="keda",
+        namespace=namespace,
+        create_namespace=True,
+        values={
+            "resources": {
+                "operator": {
+                    "requests": {"cpu": "100m", "memory": "128Mi"},
+                    "limits": {"memory": "512Mi"}
+                },
+                "metricServer": {
+                    "requests": {"cpu": "100m", "memory": "128Mi"},
+                    "limits": {"memory": "512Mi"}
+                }
+            }
+        }
+    )
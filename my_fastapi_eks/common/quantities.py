@@ -0,0 +1,37 @@
+"""Kubernetes resource quantities: "250m" CPU, "512Mi" memory."""
+import math
+
+
+MEMORY_UNITS = {
+    "Ki": 2 ** 10, "Mi": 2 ** 20, "Gi": 2 ** 30, "Ti": 2 ** 40,
+    "k": 10 ** 3, "M": 10 ** 6, "G": 10 ** 9, "T": 10 ** 12,
+}
+MI = 2 ** 20
+
+
+def parse_cpu(value) -> float:
+    """CPU quantity in cores"""
+    value = str(value)
+    if value.endswith("m"):
+        return int(value[:-1]) / 1000
+    return float(value)
+
+
+def parse_memory(value) -> int:
+    """Memory quantity in bytes"""
+    value = str(value)
+    for unit in sorted(MEMORY_UNITS, key=len, reverse=True):
+        if value.endswith(unit):
+            return int(float(value[:-len(unit)]) * MEMORY_UNITS[unit])
+    return int(value)
+
+
+def format_cpu(cores: float, step_millicores: int = 25) -> str:
+    """Round up to `step_millicores` and format as millicores"""
+    millicores = math.ceil(cores * 1000 / step_millicores) * step_millicores
+    return f"{millicores}m"
+
+
+def format_memory(size: int, step_mi: int = 16) -> str:
+    """Round up to `step_mi` MiB and format in Mi"""
+    return f"{math.ceil(size / MI / step_mi) * step_mi}Mi"
@@ -0,0 +1,82 @@
+"""Vertical Pod Autoscaler in recommendation mode, to right-size requests.
+
+Only the recommender runs (no updater, no admission controller): pods are
+never evicted or mutated, the recommendations are read back by
+tools/right_size.py and turned into new ``resources`` for the workloads.
+"""
+from my_fastapi_eks.common.quantities import format_cpu, format_memory, parse_cpu, parse_memory
+
+
+def add_vpa_recommender(cluster):
+    """Install the VPA recommender on `cluster` and return the chart"""
+    return cluster.add_helm_chart(
+        "VpaRecommender",
+        chart="vpa",
+        repository="https://charts.fairwinds.com/stable",
+        release="vpa",
+        namespace="kube-system",
+        values={
+            "recommender": {
+                "enabled": True,
+                "extraArgs": {
+                    "pod-recommendation-min-cpu-millicores": 25,
+                    "pod-recommendation-min-memory-mb": 64,
+                    "recommendation-margin-fraction": 0.15
+                }
+            },
+            "updater": {"enabled": False},
+            "admissionController": {"enabled": False}
+        }
+    )
+
+
+def vertical_pod_autoscaler(deployment: dict) -> dict:
+    """Recommendation-only VPA object for `deployment`"""
+    metadata = deployment["metadata"]
+    return {
+        "apiVersion": "autoscaling.k8s.io/v1",
+        "kind": "VerticalPodAutoscaler",
+        "metadata": {
+            "name": f"{metadata['name']}-vpa",
+            "namespace": metadata.get("namespace", "default")
+        },
+        "spec": {
+            "targetRef": {
+                "apiVersion": "apps/v1",
+                "kind": "Deployment",
+                "name": metadata["name"]
+            },
+            "updatePolicy": {"updateMode": "Off"},
+            "resourcePolicy": {
+                "containerPolicies": [{
+                    "containerName": "*",
+                    "controlledResources": ["cpu", "memory"]
+                }]
+            }
+        }
+    }
+
+
+def propose_resources(recommendation: dict, current: dict, memory_limit_headroom: float = 1.25) -> dict:
+    """New `resources` of a container from its VPA recommendation.
+
+    Requests follow the VPA target. The memory limit covers the upper bound
+    (OOM kills are worse than a bit of slack); a CPU limit is only kept if
+    the container had one, with the same limit/request ratio.
+    """
+    target = recommendation["target"]
+    cpu = parse_cpu(target["cpu"])
+    memory = parse_memory(target["memory"])
+    upper_memory = parse_memory(recommendation.get("upperBound", target)["memory"])
+
+    resources = {
+        "requests": {"cpu": format_cpu(cpu), "memory": format_memory(memory)},
+        "limits": {"memory": format_memory(max(upper_memory, memory * memory_limit_headroom))}
+    }
+
+    current_requests = current.get("requests", {})
+    current_limits = current.get("limits", {})
+    if "cpu" in current_limits and "cpu" in current_requests:
+        ratio = parse_cpu(current_limits["cpu"]) / parse_cpu(current_requests["cpu"])
+        resources["limits"]["cpu"] = format_cpu(cpu * ratio)
+    return resources
@@ -0,0 +1,157 @@
+"""Route 53 records for a service exposed through an ALB Ingress.
+
+``cname`` keeps the original behaviour (CNAME on the Ingress hostname).
+``alias`` publishes A (and optionally AAAA) alias records on the ALB itself:
+no extra resolution hop, no TTL to wait on for failover. The ALB is created by
+the load balancer controller, so its canonical zone id is read back with
+``DescribeLoadBalancers`` using the name pinned by the Ingress annotation.
+With ``latency`` or ``weighted`` routing the same record can be published by
+several clusters/regions, each with its own ``set_identifier``.
+"""
+from dataclasses import dataclass
+
+import jsii
+from aws_cdk import Duration, Stack
+from aws_cdk import aws_route53 as route53
+from aws_cdk import custom_resources as cr
+from constructs import Construct
+
+
+@dataclass(frozen=True)
+class ServiceDnsOptions:
+    mode: str = "cname"  # cname | alias
+    routing: str = "simple"  # simple | latency | weighted
+    # ALB name (32 chars max), required with alias mode
+    load_balancer_name: str | None = None
+    set_identifier: str | None = None
+    weight: int | None = None
+    # Route 53 health checkers are blocked when the ALB is locked down to CloudFront
+    health_check_path: str | None = None
+    # Needs a dualstack ALB (alb.ingress.kubernetes.io/ip-address-type) and an IPv6 VPC
+    ipv6: bool = False
+
+    def __post_init__(self):
+        if self.mode not in ("cname", "alias"):
+            raise ValueError(f"Unknown DNS mode {self.mode!r}")
+        if self.routing not in ("simple", "latency", "weighted"):
+            raise ValueError(f"Unknown DNS routing {self.routing!r}")
+        if self.mode == "alias" and not self.load_balancer_name:
+            raise ValueError("alias mode needs load_balancer_name to find the ALB")
+        if self.routing != "simple" and (self.mode != "alias" or not self.set_identifier):
+            raise ValueError("latency/weighted routing needs alias mode and a set_identifier")
+        if self.routing == "weighted" and self.weight is None:
+            raise ValueError("weighted routing needs a weight")
+
+    def ingress_annotations(self) -> dict:
+        if self.mode != "alias":
+            return {}
+        annotations = {"alb.ingress.kubernetes.io/load-balancer-name": self.load_balancer_name}
+        if self.ipv6:
+            annotations["alb.ingress.kubernetes.io/ip-address-type"] = "dualstack"
+        return annotations
+
+
+@jsii.implements(route53.IAliasRecordTarget)
+class IngressAlbTarget:
+    """Alias target for an ALB not managed by CloudFormation"""
+
+    def __init__(self, dns_name: str, hosted_zone_id: str) -> None:
+        self.dns_name = dns_name
+        self.hosted_zone_id = hosted_zone_id
+
+    def bind(self, record, zone=None) -> route53.AliasRecordTargetConfig:
+        return route53.AliasRecordTargetConfig(
+            dns_name=f"dualstack.{self.dns_name}",
+            hosted_zone_id=self.hosted_zone_id
+        )
+
+
+def add_service_records(
+        scope: Construct,
+        cluster,
+        zone: route53.IHostedZone,
+        record_name: str,
+        ingress_name: str,
+        namespace: str,
+        options: ServiceDnsOptions = ServiceDnsOptions()) -> list:
+    """Create the Route 53 records of an Ingress and return them"""
+    # Blocks until the controller has written the ALB hostname in the Ingress status
+    ingress_address = cluster.get_ingress_load_balancer_address(
+        ingress_name=ingress_name,
+        namespace=namespace
+    )
+
+    if options.mode == "cname":
+        return [
+            route53.CnameRecord(
+                scope, "FastApiCnameRecord",
+                zone=zone,
+                record_name=record_name,
+                domain_name=ingress_address,
+                ttl=Duration.minutes(5)
+            )
+        ]
+
+    alb_lookup = cr.AwsCustomResource(
+        scope, "IngressAlbLookup",
+        on_update=cr.AwsSdkCall(
+            service="ElasticLoadBalancingV2",
+            action="describeLoadBalancers",
+            parameters={"Names": [options.load_balancer_name]},
+            # Depending on the address makes the lookup wait for the ALB
+            physical_resource_id=cr.PhysicalResourceId.of(ingress_address),
+            output_paths=[
+                "LoadBalancers.0.DNSName",
+                "LoadBalancers.0.CanonicalHostedZoneId"
+            ]
+        ),
+        policy=cr.AwsCustomResourcePolicy.from_sdk_calls(
+            resources=cr.AwsCustomResourcePolicy.ANY_RESOURCE
+        )
+    )
+    alb_dns_name = alb_lookup.get_response_field("LoadBalancers.0.DNSName")
+    target = route53.RecordTarget.from_alias(
+        IngressAlbTarget(
+            dns_name=alb_dns_name,
+            hosted_zone_id=alb_lookup.get_response_field("LoadBalancers.0.CanonicalHostedZoneId")
+        )
+    )
+
+    routing_options = {}
+    if options.routing != "simple":
+        routing_options["set_identifier"] = options.set_identifier
+    if options.routing == "latency":
+        routing_options["region"] = Stack.of(scope).region
+    if options.routing == "weighted":
+        routing_options["weight"] = options.weight
+    if options.health_check_path:
+        routing_options["health_check"] = route53.HealthCheck(
+            scope, "FastApiHealthCheck",
+            type=route53.HealthCheckType.HTTPS,
+            fqdn=alb_dns_name,
+            port=443,
+            resource_path=options.health_check_path,
+            request_interval=Duration.seconds(10),
+            failure_threshold=3
+        )
+
+    records = [
+        route53.ARecord(
+            scope, "FastApiAliasRecord",
+            zone=zone,
+            record_name=record_name,
+            target=target,
+            **routing_options
+        )
+    ]
+    if options.ipv6:
+        records.append(
+            route53.AaaaRecord(
+                scope, "FastApiAliasRecordIpv6",
+                zone=zone,
+                record_name=record_name,
+                target=target,
+                **routing_options
+            )
+        )
+    return records
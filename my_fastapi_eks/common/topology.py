@@ -0,0 +1,63 @@
+"""Zone/node spreading and zone-local routing of a workload.
+
+Replicas are spread over zones (topology spread constraint) and nodes
+(anti-affinity), so losing a node or an AZ never takes most of the capacity.
+The Service prefers endpoints in the zone of the client
+(``trafficDistribution: PreferClose``), which saves a cross-AZ hop and its
+data-transfer cost as long as every zone has ready endpoints. Hence the zone
+spread, and the zone requirement of the Karpenter NodePool, which lets
+Karpenter launch nodes in the zone a pending replica needs.
+"""
+from dataclasses import dataclass
+
+
+ZONE_KEY = "topology.kubernetes.io/zone"
+HOSTNAME_KEY = "kubernetes.io/hostname"
+
+
+@dataclass(frozen=True)
+class TopologySpread:
+    zone_max_skew: int = 1
+    # DoNotSchedule only where the capacity follows (Karpenter): elsewhere a
+    # full AZ would block the scale-out
+    zone_when_unsatisfiable: str = "ScheduleAnyway"
+    # preferred / required / None (Fargate: one micro VM per pod)
+    node_anti_affinity: str | None = "preferred"
+    prefer_close: bool = True
+
+    def __post_init__(self):
+        if self.zone_when_unsatisfiable not in ("ScheduleAnyway", "DoNotSchedule"):
+            raise ValueError(f"Unknown whenUnsatisfiable: {self.zone_when_unsatisfiable}")
+        if self.node_anti_affinity not in ("preferred", "required", None):
+            raise ValueError(f"Unknown node anti-affinity: {self.node_anti_affinity}")
+
+    def pod_spec(self, labels: dict) -> dict:
+        """topologySpreadConstraints / affinity of pods labelled `labels`"""
+        spec = {
+            "topologySpreadConstraints": [{
+                "maxSkew": self.zone_max_skew,
+                "topologyKey": ZONE_KEY,
+                "whenUnsatisfiable": self.zone_when_unsatisfiable,
+                "labelSelector": {"matchLabels": labels},
+                # Spread each rollout on its own, not old + new ReplicaSets together
+                "matchLabelKeys": ["pod-template-hash"]
+            }]
+        }
+
+        term = {"topologyKey": HOSTNAME_KEY, "labelSelector": {"matchLabels": labels}}
+        if self.node_anti_affinity == "required":
+            spec["affinity"] = {"podAntiAffinity": {
+                "requiredDuringSchedulingIgnoredDuringExecution": [term]
+            }}
+        elif self.node_anti_affinity == "preferred":
+            spec["affinity"] = {"podAntiAffinity": {
+                "preferredDuringSchedulingIgnoredDuringExecution": [{"weight": 100, "podAffinityTerm": term}]
+            }}
+        return spec
+
+    def service_spec(self) -> dict:
+        return {"trafficDistribution": "PreferClose"} if self.prefer_close else {}
+
+    def karpenter_requirements(self, zones: list) -> list:
+        """NodePool requirements keeping nodes in the zones the workload spreads over"""
+        return [{"key": ZONE_KEY, "operator": "In", "values": list(zones)}]
@@ -0,0 +1,80 @@
+"""Workload tiers: PriorityClass + QoS class.
+
+Under node pressure the kubelet evicts pods using more than their requests
+first, then by priority; when a pod cannot be scheduled the scheduler
+preempts lower priority pods. The serving path wins both:
+
+* latency-critical: highest priority, Guaranteed QoS (requests = limits, so
+  never over its requests; with the static CPU manager of the latency
+  NodeTuningProfile, integer CPU requests get exclusive cores).
+* batch: below the default priority (0, monitoring agents and unclassified
+  pods), never preempts anything.
+* placeholder: lowest priority, preempted first. Capacity reservation
+  (pause pods like the ``inflate`` test deployment) keeps its requests.
+"""
+from dataclasses import dataclass
+
+
+QOS_CLASSES = ("Guaranteed", "Burstable")
+
+
+@dataclass(frozen=True)
+class WorkloadTier:
+    name: str
+    priority: int
+    qos: str = "Burstable"
+    preempts: bool = True
+    description: str = ""
+
+    def __post_init__(self):
+        if self.qos not in QOS_CLASSES:
+            raise ValueError(f"Unknown QoS class {self.qos!r}, expected one of {QOS_CLASSES}")
+
+    def priority_class(self) -> dict:
+        return {
+            "apiVersion": "scheduling.k8s.io/v1",
+            "kind": "PriorityClass",
+            "metadata": {"name": self.name},
+            "value": self.priority,
+            "preemptionPolicy": "PreemptLowerPriority" if self.preempts else "Never",
+            "globalDefault": False,
+            "description": self.description
+        }
+
+    def apply(self, pod_spec: dict) -> dict:
+        """Select the tier in `pod_spec` (in place) and return it.
+
+        Guaranteed raises the requests to the limits, limits missing are set
+        to the requests: the pod reserves what it may use.
+        """
+        pod_spec["priorityClassName"] = self.name
+        if self.qos == "Guaranteed":
+            for container in pod_spec.get("initContainers", []) + pod_spec["containers"]:
+                resources = container.setdefault("resources", {})
+                requests = resources.setdefault("requests", {})
+                limits = resources.setdefault("limits", {})
+                for resource in ("cpu", "memory"):
+                    value = limits.get(resource, requests.get(resource))
+                    if value is None:
+                        raise ValueError(f"{container['name']}: Guaranteed QoS needs a {resource} request or limit")
+                    requests[resource] = limits[resource] = value
+        return pod_spec
+
+
+LATENCY_CRITICAL = WorkloadTier(
+    "latency-critical", 100000, qos="Guaranteed",
+    description="Serving path: scheduled, kept and given CPU before anything else"
+)
+BATCH = WorkloadTier(
+    "batch", -100, preempts=False,
+    description="Background work: waits for capacity, evicted before the default priority"
+)
+PLACEHOLDER = WorkloadTier(
+    "placeholder", -1000, preempts=False,
+    description="Capacity reservation (pause pods): preempted first"
+)
+TIERS = (LATENCY_CRITICAL, BATCH, PLACEHOLDER)
+
+
+def priority_classes() -> list:
+    return [tier.priority_class() for tier in TIERS]
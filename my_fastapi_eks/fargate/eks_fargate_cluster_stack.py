@@ -6,13 +6,31 @@ from aws_cdk import aws_route53 as route53
 from aws_cdk import aws_route53_targets as targets
 from constructs import Construct
 from aws_cdk.lambda_layer_kubectl_v32 import KubectlV32Layer
-from aws_cdk import Duration
+from aws_cdk import Duration, Size
 import json
 
+from my_fastapi_eks.common.dns_cache import add_dns_cache
+from my_fastapi_eks.common.log_shipping import APPLICATION_LOG_GROUP, fargate_log_router
+from my_fastapi_eks.common.manifest_bundle import ManifestBundle
+from my_fastapi_eks.common.metrics_server import add_metrics_server
+from my_fastapi_eks.common.otel_collector import NAMESPACE as OTEL_NAMESPACE, TraceSampling, add_otel_collector
+from my_fastapi_eks.common.prescaling import add_keda
+from my_fastapi_eks.common.right_sizing import add_vpa_recommender
+from my_fastapi_eks.common.workload_tiers import priority_classes
+from my_fastapi_eks.fargate.fargate_profiles import FargateProfileShard
+
 
 class EksFargateClusterStack(Stack):
 
-    def __init__(self, scope: Construct, construct_id: str, **kwargs) -> None:
+    def __init__(self,
+                 scope: Construct,
+                 construct_id: str,
+                 kubectl_memory: Size = Size.gibibytes(2),
+                 app_profiles: tuple = (FargateProfileShard("AppProfile", namespace="fastapi"),),
+                 right_sizing: bool = False,
+                 # None: no collector, the app does not trace
+                 trace_sampling: TraceSampling = TraceSampling(),
+                 **kwargs) -> None:
         super().__init__(scope, construct_id, **kwargs)
 
         # 1. VPC
@@ -25,6 +43,8 @@ class EksFargateClusterStack(Stack):
             version=eks.KubernetesVersion.V1_32,
             vpc=vpc,
             kubectl_layer=KubectlV32Layer(self, "KubectlLayer"),
+            # More memory = more vCPU for the kubectl/helm Lambda
+            kubectl_memory=kubectl_memory,
             cluster_logging=[
                 eks.ClusterLoggingTypes.API,
                 eks.ClusterLoggingTypes.AUDIT,
@@ -43,6 +63,10 @@ class EksFargateClusterStack(Stack):
             username="pcourteille"
         )
 
+        # Add-ons only declare the dependencies they really need (service account,
+        # namespace, Fargate profile) so CloudFormation installs the independent charts
+        # concurrently. tools/critical_path.py shows what is left on the critical path.
+
         # 3. Namespace
         fastapi_ns = {
             "apiVersion": "v1",
@@ -54,7 +78,6 @@ class EksFargateClusterStack(Stack):
                 }
             }
         }
-        fastapi_namespace = cluster.add_manifest("FastApiNamespace", fastapi_ns)
 
         cloudwatch_ns = {
             "apiVersion": "v1",
@@ -63,18 +86,20 @@ class EksFargateClusterStack(Stack):
                 "name": "amazon-cloudwatch"
             }
         }
-        cloudwatch_namespace = cluster.add_manifest("CloudWatchNamespace", cloudwatch_ns)
-
-        # 4. Fargate Profile
-        fastapi_profile = cluster.add_fargate_profile(
-            "AppProfile",
-            fargate_profile_name="AppProfile",
-            selectors=[
-                eks.Selector(namespace="fastapi"),
-            ]
+        # + PriorityClasses of the workload tiers (pods naming a missing class are rejected)
+        namespaces = ManifestBundle(
+            cluster, "Namespaces",
+            cluster=cluster,
+            manifests=[fastapi_ns, cloudwatch_ns, *priority_classes()],
+            # Ids of the objects before the bundle: retained for one release (manifest_bundle.py)
+            legacy_ids={"FastApiNamespace": fastapi_ns, "CloudWatchNamespace": cloudwatch_ns}
         )
 
-        # fastapi_profile.node.add_dependency(fastapi_namespace)
+        # 4. Fargate Profiles
+        # kube-system (CoreDNS, metrics-server, ALB controller) runs on the default
+        # profile of the FargateCluster, in the private subnets of every AZ.
+        # App pods are sharded by label, each shard in its own subnets.
+        app_profiles = {shard.name: shard.add_to(cluster) for shard in app_profiles}
 
         cloudwatch_profile = cluster.add_fargate_profile(
             "MonitoringProfile",
@@ -84,7 +109,7 @@ class EksFargateClusterStack(Stack):
             ]
         )
 
-        # cloudwatch_profile.node.add_dependency(cloudwatch_namespace)
+        # cloudwatch_profile.node.add_dependency(namespaces)
 
         # 5. CloudWatch Agent
         cloudwatch_sa = cluster.add_service_account(
@@ -101,7 +126,7 @@ class EksFargateClusterStack(Stack):
             iam.Policy(self, "CloudWatchPolicy", document=cloudwatch_policy_doc)
         )
 
-        cloudwatch_sa.node.add_dependency(cloudwatch_namespace)
+        cloudwatch_sa.node.add_dependency(namespaces)
 
         cloudwatch_chart = cluster.add_helm_chart(
             "CloudWatchAgentChart",
@@ -120,23 +145,11 @@ class EksFargateClusterStack(Stack):
         )
 
         cloudwatch_chart.node.add_dependency(cloudwatch_sa)
+        # Pods created before their Fargate profile exists stay Pending forever
+        cloudwatch_chart.node.add_dependency(cloudwatch_profile)
 
-        # 6. Metrics Server
-        metrics_server_chart = cluster.add_helm_chart(
-            "MetricsServer",
-            chart="metrics-server",
-            release="metrics-server",
-            repository="https://kubernetes-sigs.github.io/metrics-server/",
-            namespace="kube-system",
-            values={
-                "args": [
-                    "--kubelet-insecure-tls",  # souvent nécessaire sur EKS
-                    "--kubelet-preferred-address-types=InternalIP"
-                ]
-            }
-        )
-
-        metrics_server_chart.node.add_dependency(cloudwatch_chart)
+        # 6. Metrics Server (feeds the HPA, one replica per AZ on the default profile)
+        metrics_server_chart = add_metrics_server(cluster, fargate=True)
 
         # 8. AWS Load Balancer Controller
         alb_sa = cluster.add_service_account(
@@ -154,8 +167,6 @@ class EksFargateClusterStack(Stack):
             iam.Policy(self, "ALBControllerIAMPolicy", document=alb_policy)
         )
 
-        alb_sa.node.add_dependency(metrics_server_chart)
-
         alb_chart = cluster.add_helm_chart(
             "AWSLoadBalancerController",
             chart="aws-load-balancer-controller",
@@ -171,12 +182,71 @@ class EksFargateClusterStack(Stack):
                 },
                 "region": self.region,
                 "vpcId": vpc.vpc_id,
-                "replicaCount": 2
+                "replicaCount": 2,
+                # Mutates every new Service and fails closed while the controller starts:
+                # other charts could not be installed concurrently. Not needed without LoadBalancer Services.
+                "enableServiceMutatorWebhook": False
             }
         )
 
         alb_chart.node.add_dependency(alb_sa)
 
+        # 9. CoreDNS autoscaling (no NodeLocal DNS cache: DaemonSets do not run on Fargate)
+        dns_charts = add_dns_cache(cluster, fargate=True)
+
+        # 10. KEDA (scheduled / predictive pre-scaling)
+        keda_profile = cluster.add_fargate_profile(
+            "KedaProfile",
+            fargate_profile_name="KedaProfile",
+            selectors=[
+                eks.Selector(namespace="keda"),
+            ]
+        )
+        keda_chart = add_keda(cluster)
+        keda_chart.node.add_dependency(keda_profile)
+
+        # 11. VPA recommender (right-sizing, see tools/right_size.py), kube-system runs on the default profile
+        vpa_chart = add_vpa_recommender(cluster) if right_sizing else None
+
+        # 12. Log router of the Fargate pods: JSON logs to CloudWatch, batched (log_shipping.py)
+        # (no DaemonSet on Fargate, read when a pod starts: before the app pods)
+        log_router = ManifestBundle(
+            cluster, "LogRouter",
+            cluster=cluster,
+            manifests=fargate_log_router(
+                region=self.region,
+                log_group=APPLICATION_LOG_GROUP.format(cluster_name=cluster.cluster_name)
+            )
+        )
+        iam.Policy(
+            self, "FargateLogRouterPolicy",
+            document=cloudwatch_policy_doc,
+            roles=[cluster.default_profile.pod_execution_role]
+                  + [profile.pod_execution_role for profile in app_profiles.values()]
+        )
+
+        # 13. OpenTelemetry collector: tail sampling, traces to X-Ray (otel_collector.py)
+        otel_collector = None
+        if trace_sampling:
+            otel_profile = cluster.add_fargate_profile(
+                "OtelProfile",
+                fargate_profile_name="OtelProfile",
+                selectors=[
+                    eks.Selector(namespace=OTEL_NAMESPACE),
+                ]
+            )
+            otel_collector = add_otel_collector(cluster, region=self.region, sampling=trace_sampling)
+            otel_collector.node.add_dependency(otel_profile)
+
         self.eks_cluster = cluster
         self.alb_chart = alb_chart
+        self.metrics_server = metrics_server_chart
+        self.app_profiles = app_profiles
         self.vpc = vpc
+        self.dns_charts = dns_charts
+        self.keda_chart = keda_chart
+        self.vpa_chart = vpa_chart
+        self.priority_classes = namespaces
+        self.log_router = log_router
+        self.otel_collector = otel_collector
+        self.trace_sampling = trace_sampling
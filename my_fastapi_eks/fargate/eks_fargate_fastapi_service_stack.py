@@ -10,6 +10,18 @@ from constructs import Construct
 from aws_cdk import Duration
 import json
 
+from my_fastapi_eks.common.alb_tuning import AlbTuning
+from my_fastapi_eks.common.edge_cache import EdgeCacheOptions, add_edge_cache, origin_lockdown_annotations
+from my_fastapi_eks.common.manifest_bundle import ManifestBundle
+from my_fastapi_eks.common.otel_collector import TraceSampling
+from my_fastapi_eks.common.prescaling import PreScaling
+from my_fastapi_eks.common.right_sizing import vertical_pod_autoscaler
+from my_fastapi_eks.common.service_dns import ServiceDnsOptions, add_service_records
+from my_fastapi_eks.common.topology import TopologySpread
+from my_fastapi_eks.common.workload_tiers import LATENCY_CRITICAL, WorkloadTier
+from my_fastapi_eks.fargate.fargate_profiles import FargateProfileShard
+from my_fastapi_eks.fargate.fargate_sizing import FargateTier, warn_on_waste
+
 
 class EksFargateFastApiServiceStack(Stack):
 
@@ -19,13 +31,31 @@ class EksFargateFastApiServiceStack(Stack):
             construct_id: str,
             cluster: eks.FargateCluster,
             alb_chart: eks.HelmChart,
+            metric_server: eks.HelmChart = None,
+            fargate_profile: FargateProfileShard = None,
+            pod_size: FargateTier = FargateTier(0.25, 1),
+            alb_tuning: AlbTuning = AlbTuning(),
+            # One micro VM per pod: no node anti-affinity
+            topology: TopologySpread = TopologySpread(node_anti_affinity=None),
+            tier: WorkloadTier = LATENCY_CRITICAL,
+            dns: ServiceDnsOptions = ServiceDnsOptions(),
+            edge_cache: EdgeCacheOptions = None,
+            pre_scaling: PreScaling = None,
+            keda_chart: eks.HelmChart = None,
+            vpa_chart: eks.HelmChart = None,
+            priority_classes: Construct = None,
+            log_router: Construct = None,
+            # Tracing on, spans to the collector of the cluster stack
+            trace_sampling: TraceSampling = None,
+            otel_collector: eks.HelmChart = None,
             **kwargs) -> None:
         super().__init__(scope, construct_id, **kwargs)
 
         self.cluster = cluster
 
         # 1. FastAPI Deployment for Fargate
-        # Note: Fargate requires specific resource requests and limits
+        # Note: Fargate bills the tier the requests round up to, the requests fill it
+        # (pick the tier with tools/fargate_size.py)
         deployment = {
             "apiVersion": "apps/v1",
             "kind": "Deployment",
@@ -37,7 +67,7 @@ class EksFargateFastApiServiceStack(Stack):
                 }
             },
             "spec": {
-                "replicas": 1,
+                # No replicas: the HPA owns them, re-applying the manifest must not reset them
                 "selector": {
                     "matchLabels": {
                         "app": "fastapi"
@@ -46,7 +76,8 @@ class EksFargateFastApiServiceStack(Stack):
                 "template": {
                     "metadata": {
                         "labels": {
-                            "app": "fastapi"
+                            "app": "fastapi",
+                            **(fargate_profile.pod_labels() if fargate_profile else {})
                         }
                     },
                     "spec": {
@@ -54,16 +85,7 @@ class EksFargateFastApiServiceStack(Stack):
                             "name": "fastapi",
                             "image": "532673134317.dkr.ecr.eu-west-1.amazonaws.com/services/eks/fastapi_hello_world:latest",
                             "ports": [{"containerPort": 8000}],
-                            "resources": {
-                                "requests": {
-                                    "cpu": "250m",
-                                    "memory": "512Mi"
-                                },
-                                "limits": {
-                                    "cpu": "500m",
-                                    "memory": "1Gi"
-                                }
-                            },
+                            "resources": pod_size.resources(),
                             # "livenessProbe": {
                             #     "httpGet": {
                             #         "path": "/health",
@@ -72,26 +94,37 @@ class EksFargateFastApiServiceStack(Stack):
                             #     "initialDelaySeconds": 30,
                             #     "periodSeconds": 10
                             # },
-                            # "readinessProbe": {
-                            #     "httpGet": {
-                            #         "path": "/health",
-                            #         "port": 8000
-                            #     },
-                            #     "initialDelaySeconds": 5,
-                            #     "periodSeconds": 5
-                            # },
+                            # Ready as soon as the app answers (no initial delay, 2s period)
+                            "readinessProbe": {
+                                "httpGet": {"path": "/health", "port": 8000},
+                                "periodSeconds": 2,
+                                "failureThreshold": 3
+                            },
                             "env": [
                                 {
                                     "name": "ENVIRONMENT",
                                     "value": "production"
+                                },
+                                *alb_tuning.container_env(),
+                                *(trace_sampling.container_env() if trace_sampling else []),
+                                # /admin/profile/* of the app, only once the Secret exists (-n fastapi)
+                                {
+                                    "name": "FASTAPI_PROFILING_TOKEN",
+                                    "valueFrom": {"secretKeyRef": {
+                                        "name": "fastapi-profiling", "key": "token", "optional": True
+                                    }}
                                 }
                             ]
-                        }]
+                        }],
+                        **topology.pod_spec({"app": "fastapi"})
                     }
                 }
             }
         }
-        fastapi_deployment = cluster.add_manifest("FastApiDeployment", deployment)
+
+        # PriorityClass + QoS (Guaranteed: CPU limit = the tier, it can't use more anyway)
+        tier.apply(deployment["spec"]["template"]["spec"])
+        warn_on_waste(self, deployment)
 
         # 3. FastAPI Service - Changer en ClusterIP
         service = {
@@ -111,12 +144,15 @@ class EksFargateFastApiServiceStack(Stack):
                     "targetPort": 8000,
                     "protocol": "TCP"
                 }],
-                "type": "ClusterIP"  # Au lieu de LoadBalancer
+                "type": "ClusterIP",  # Au lieu de LoadBalancer
+                **topology.service_spec()
             }
         }
-        fastapi_service = cluster.add_manifest("FastApiService", service)
 
         # 4. Ingress for FastAPI (using ALB Controller)
+        # Only CloudFront may reach the ALB (on 443) when the edge cache is enabled
+        edge_annotations = origin_lockdown_annotations(self, "fastapi-service", edge_cache) if edge_cache else {}
+
         ingress = {
             "apiVersion": "networking.k8s.io/v1",
             "kind": "Ingress",
@@ -128,7 +164,12 @@ class EksFargateFastApiServiceStack(Stack):
                     "alb.ingress.kubernetes.io/target-type": "ip",
                     "alb.ingress.kubernetes.io/listen-ports": '[{"HTTP": 80}, {"HTTPS": 443}]',
                     "alb.ingress.kubernetes.io/certificate-arn": "arn:aws:acm:eu-west-1:532673134317:certificate/905d0d16-87e8-4e89-a88c-b6053f472e81",
-                    "alb.ingress.kubernetes.io/ssl-redirect": "443",
+                    # HTTPS only behind CloudFront, no HTTP listener to redirect
+                    **({} if edge_cache else {"alb.ingress.kubernetes.io/ssl-redirect": "443"}),
+                    "alb.ingress.kubernetes.io/healthcheck-path": "/health",
+                    **alb_tuning.annotations(),
+                    **dns.ingress_annotations(),
+                    **edge_annotations
                 }
             },
             "spec": {
@@ -154,10 +195,9 @@ class EksFargateFastApiServiceStack(Stack):
                 }]
             }
         }
-        fastapi_ingress = cluster.add_manifest("FastApiIngress", ingress)
 
         # 5. Horizontal Pod Autoscaler for Fargate
-        # Useless with fargate !
+        # Each new replica is a new micro VM (~1 min to Ready): at least 2, one per AZ
         hpa = {
             "apiVersion": "autoscaling/v2",
             "kind": "HorizontalPodAutoscaler",
@@ -171,7 +211,7 @@ class EksFargateFastApiServiceStack(Stack):
                     "kind": "Deployment",
                     "name": "fastapi-app"
                 },
-                "minReplicas": 1,
+                "minReplicas": 2,
                 "maxReplicas": 5,
                 "metrics": [
                     {
@@ -187,29 +227,72 @@ class EksFargateFastApiServiceStack(Stack):
                 ]
             }
         }
-        fastapi_hpa = cluster.add_manifest("FastApiHPA", hpa)
 
-        # Store references for potential use in other stacks
-        fastapi_deployment.node.add_dependency(alb_chart)
-        fastapi_service.node.add_dependency(fastapi_deployment)
-        fastapi_hpa.node.add_dependency(fastapi_service)
-        fastapi_ingress.node.add_dependency(fastapi_hpa)
+        # Pre-scaling: KEDA owns the HPA (CPU trigger + cron windows)
+        autoscaler = pre_scaling.scaled_object(hpa) if pre_scaling else hpa
+        if pre_scaling and not keda_chart:
+            raise ValueError("pre_scaling needs the keda_chart of the cluster stack")
 
-        # 5. A Record pointant vers l'ALB
+        # Right-sizing: recommendation-only VPA, read by tools/right_size.py
+        right_sizing = [vertical_pod_autoscaler(deployment)] if vpa_chart else []
+
+        # 6. Apply all the manifests in a single kubectl invocation
+        # (scope = cluster, like cluster.add_manifest)
+        fastapi_manifests = ManifestBundle(
+            cluster, "FastApiManifests",
+            cluster=cluster,
+            manifests=[deployment, service, ingress, autoscaler, *right_sizing],
+            # Ids of the objects before the bundle: retained for one release (manifest_bundle.py)
+            legacy_ids={
+                "FastApiDeployment": deployment,
+                "FastApiService": service,
+                "FastApiIngress": ingress,
+                # pre_scaling: the bundle applies the ScaledObject first, KEDA adopts the
+                # HPA of the same name (transfer-hpa-ownership, prescaling.py)
+                "FastApiHPA": autoscaler,
+            }
+        )
+        # The ALB controller webhooks validate the Ingress, metrics-server feeds the HPA
+        fastapi_manifests.node.add_dependency(alb_chart)
+        if metric_server:
+            fastapi_manifests.node.add_dependency(metric_server)
+        if keda_chart:
+            fastapi_manifests.node.add_dependency(keda_chart)
+        if vpa_chart:
+            fastapi_manifests.node.add_dependency(vpa_chart)
+        if otel_collector:
+            fastapi_manifests.node.add_dependency(otel_collector)
+        if priority_classes:
+            fastapi_manifests.node.add_dependency(priority_classes)
+        # Fargate reads the log configuration when the pod starts
+        if log_router:
+            fastapi_manifests.node.add_dependency(log_router)
+
+        # 7. Records DNS pointant vers l'ALB
         hosted_zone = route53.HostedZone.from_lookup(
             self, "HostedZone",
             domain_name="piercuta.com"
         )
 
-        recort_set = route53.CnameRecord(
-            self, "FastApiCnameRecord",
+        records = add_service_records(
+            self, cluster,
             zone=hosted_zone,
             record_name="fargate-eks-fastapi",
-            domain_name=cluster.get_ingress_load_balancer_address(
-                ingress_name="fastapi-ingress",
-                namespace="fastapi"
-            ),
-            ttl=Duration.minutes(5)
+            ingress_name="fastapi-ingress",
+            namespace="fastapi",
+            options=dns
         )
 
-        recort_set.node.add_dependency(fastapi_ingress)
+        for record in records:
+            record.node.add_dependency(fastapi_manifests)
+
+        # 8. CloudFront devant l'ALB
+        if edge_cache:
+            distribution = add_edge_cache(
+                self,
+                origin_domain_name="fargate-eks-fastapi.piercuta.com",
+                zone=hosted_zone,
+                options=edge_cache
+            )
+            for record in records:
+                distribution.node.add_dependency(record)
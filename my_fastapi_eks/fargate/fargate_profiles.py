@@ -0,0 +1,39 @@
+"""Label-based Fargate profiles (sharding).
+
+A profile selects pods by namespace and labels and runs them in its own
+subnets. Several shards in one namespace let workloads run in different AZs
+or subnet ranges (IP exhaustion, isolation) or be torn down separately.
+
+When a pod matches several profiles Fargate picks one at random unless the
+pod carries ``eks.amazonaws.com/fargate-profile``: ``pod_labels()`` adds it.
+"""
+from dataclasses import dataclass, field
+
+from aws_cdk import aws_ec2 as ec2
+from aws_cdk import aws_eks as eks
+
+
+PROFILE_LABEL = "eks.amazonaws.com/fargate-profile"
+
+
+@dataclass(frozen=True)
+class FargateProfileShard:
+    name: str
+    namespace: str
+    labels: dict = field(default_factory=dict)
+    # Private subnets only; None = the private subnets of the cluster
+    subnets: ec2.SubnetSelection = None
+
+    def add_to(self, cluster: eks.Cluster) -> eks.FargateProfile:
+        return cluster.add_fargate_profile(
+            self.name,
+            fargate_profile_name=self.name,
+            selectors=[
+                eks.Selector(namespace=self.namespace, labels=self.labels or None),
+            ],
+            subnet_selection=self.subnets
+        )
+
+    def pod_labels(self) -> dict:
+        """Labels for the pod template of a workload running in this shard"""
+        return {**self.labels, PROFILE_LABEL: self.name}
@@ -0,0 +1,132 @@
+"""Fargate pod sizing: pod requests -> billed vCPU/memory tier.
+
+Fargate sizes the micro-VM of a pod from its requests (the largest of the sum
+of the containers and of any init container) plus 256 MB for kubelet,
+kube-proxy and containerd, rounded up to the next supported combination. The
+tier is what is billed and what the pod gets: CPU limits above it are never
+honoured, memory below it is paid for but unused.
+
+The provisioned tier shows in the ``CapacityProvisioned`` annotation of the
+pod. tools/fargate_size.py benchmarks the tiers and picks the one with the
+best throughput per dollar.
+"""
+from dataclasses import dataclass
+
+from aws_cdk import Annotations
+
+from my_fastapi_eks.common.quantities import MI, format_cpu, format_memory, parse_cpu, parse_memory
+
+
+GI = 1024 * MI
+OVERHEAD_MEMORY = 256 * MI
+
+# vCPU -> supported memory (GB)
+TIERS = {
+    0.25: (0.5, 1, 2),
+    0.5: tuple(range(1, 5)),
+    1: tuple(range(2, 9)),
+    2: tuple(range(4, 17)),
+    4: tuple(range(8, 31)),
+}
+
+# eu-west-1, Linux/x86, on-demand
+VCPU_HOUR = 0.04048
+GB_HOUR = 0.004445
+
+
+@dataclass(frozen=True, order=True)
+class FargateTier:
+    vcpu: float = 0.25
+    memory_gb: float = 1
+
+    def __post_init__(self):
+        if self.memory_gb not in TIERS.get(self.vcpu, ()):
+            raise ValueError(f"{self} is not a Fargate combination")
+
+    def __str__(self):
+        return f"{self.vcpu:g} vCPU / {self.memory_gb:g} GB"
+
+    @property
+    def hourly_cost(self) -> float:
+        return self.vcpu * VCPU_HOUR + self.memory_gb * GB_HOUR
+
+    def resources(self) -> dict:
+        """Container resources using the whole tier (single container pod).
+
+        No CPU limit: the pod cannot use more than the tier anyway, and the
+        memory limit equals the request, which is all the micro-VM has.
+        """
+        memory = format_memory(self.memory_gb * GI - OVERHEAD_MEMORY)
+        return {
+            "requests": {"cpu": format_cpu(self.vcpu), "memory": memory},
+            "limits": {"memory": memory}
+        }
+
+
+def fargate_tier(cpu: float, memory: int) -> FargateTier:
+    """Smallest tier for a pod requesting `cpu` cores and `memory` bytes"""
+    memory += OVERHEAD_MEMORY
+    for vcpu, memories in TIERS.items():
+        if vcpu < cpu:
+            continue
+        for memory_gb in memories:
+            if memory_gb * GI >= memory:
+                return FargateTier(vcpu, memory_gb)
+    raise ValueError(f"No Fargate tier for {cpu} vCPU / {memory / GI:.2f} GB")
+
+
+def pod_requests(pod_spec: dict) -> tuple:
+    """(cores, bytes) Fargate sizes a pod from"""
+    def container_requests(container):
+        resources = container.get("resources", {})
+        # A limit without request is the request
+        requests = {**resources.get("limits", {}), **resources.get("requests", {})}
+        return parse_cpu(requests.get("cpu", 0)), parse_memory(requests.get("memory", 0))
+
+    containers = [container_requests(container) for container in pod_spec["containers"]]
+    init_containers = [container_requests(container) for container in pod_spec.get("initContainers", [])]
+    cpu = max(sum(cpu for cpu, _ in containers), max((cpu for cpu, _ in init_containers), default=0))
+    memory = max(sum(memory for _, memory in containers), max((memory for _, memory in init_containers), default=0))
+    return cpu, memory
+
+
+def warn_on_waste(scope, deployment: dict, threshold: float = 0.1) -> FargateTier:
+    """Synth warning when the billed tier is `threshold` above the requests"""
+    pod_spec = deployment["spec"]["template"]["spec"]
+    cpu, memory = pod_requests(pod_spec)
+    tier = fargate_tier(cpu, memory)
+    unused_cpu = tier.vcpu - cpu
+    unused_memory = tier.memory_gb * GI - OVERHEAD_MEMORY - memory
+    wasted = (unused_cpu * VCPU_HOUR + unused_memory / GI * GB_HOUR) / tier.hourly_cost
+    if wasted > threshold:
+        Annotations.of(scope).add_warning(
+            f"{deployment['metadata']['name']}: billed as {tier}, "
+            f"{unused_cpu:g} vCPU and {unused_memory // MI} Mi requested by nobody "
+            f"({wasted:.0%} of ${tier.hourly_cost:.4f}/h), use FargateTier.resources()"
+        )
+
+    for container in pod_spec["containers"]:
+        cpu_limit = container.get("resources", {}).get("limits", {}).get("cpu")
+        if cpu_limit and parse_cpu(cpu_limit) > tier.vcpu:
+            Annotations.of(scope).add_warning(
+                f"{deployment['metadata']['name']}/{container['name']}: CPU limit {cpu_limit} "
+                f"is above the {tier.vcpu:g} vCPU the pod gets on Fargate"
+            )
+    return tier
+
+
+def best_tier(benchmarks: list, max_p99_ms: float = None) -> tuple:
+    """(tier, requests per second per dollar-hour) of the most cost efficient run.
+
+    `benchmarks` are (FargateTier, requests per second, p99 ms) measured on
+    our own service, runs above the `max_p99_ms` latency budget are ignored.
+    """
+    candidates = [
+        (rps / tier.hourly_cost, tier)
+        for tier, rps, p99_ms in benchmarks
+        if max_p99_ms is None or p99_ms <= max_p99_ms
+    ]
+    if not candidates:
+        raise ValueError("No benchmark run within the latency budget")
+    efficiency, tier = max(candidates)
+    return tier, efficiency
@@ -5,6 +5,7 @@ from aws_cdk import (
     aws_iam as iam,
     aws_eks_v2_alpha as eks_alpha,
     RemovalPolicy,
+    Size,
     aws_codebuild as codebuild,
 )
 from aws_cdk.lambda_layer_kubectl_v32 import KubectlV32Layer
@@ -12,15 +13,45 @@ import json
 import yaml
 from aws_cdk import Tags
 
+from my_fastapi_eks.common.dns_cache import add_dns_cache
+from my_fastapi_eks.common.log_shipping import add_fluent_bit
+from my_fastapi_eks.common.manifest_bundle import ManifestBundle
+from my_fastapi_eks.common.metrics_server import add_metrics_server
+from my_fastapi_eks.common.node_tuning import NodeTuningProfile
+from my_fastapi_eks.common.otel_collector import TraceSampling, add_otel_collector
+from my_fastapi_eks.common.prescaling import add_keda
+from my_fastapi_eks.common.right_sizing import add_vpa_recommender
+from my_fastapi_eks.common.topology import TopologySpread
+from my_fastapi_eks.common.workload_tiers import priority_classes
+from my_fastapi_eks.karpenter.karpenter_controller import (
+    CONTROLLER_NODE_LABEL,
+    CONTROLLER_TAINT_KEY,
+    KarpenterControllerPlacement,
+)
+
 
 class CdkEksKarpenterStack(Stack):
 
     def __init__(self, scope: Construct,
                  construct_id: str,
                  codebuild_project: codebuild.Project,
+                 node_tuning: NodeTuningProfile = None,
+                 kubectl_memory: Size = Size.gibibytes(2),
+                 controller_placement: KarpenterControllerPlacement = KarpenterControllerPlacement(),
+                 right_sizing: bool = False,
+                 # None: no collector (FASTAPI_TRACING in k8s_manifests/fast-api.yaml)
+                 trace_sampling: TraceSampling = TraceSampling(),
+                 # Karpenter launches nodes in the zone a pending replica needs: the zone spread can be strict
+                 topology: TopologySpread = TopologySpread(zone_when_unsatisfiable="DoNotSchedule"),
                  **kwargs) -> None:
         super().__init__(scope, construct_id, **kwargs)
         self.codebuild_project = codebuild_project
+        self.node_tuning = node_tuning
+        self.kubectl_memory = kubectl_memory
+        self.controller_placement = controller_placement
+        self.right_sizing = right_sizing
+        self.trace_sampling = trace_sampling
+        self.topology = topology
 
         self.cluster_name = "karpenter-eks-cluster"
         self.vpc = self.create_vpc()
@@ -29,9 +60,16 @@ class CdkEksKarpenterStack(Stack):
         Tags.of(self.eks_cluster.cluster_security_group).add("karpenter.sh/discovery", self.cluster_name)
         Tags.of(self.eks_cluster.cluster_security_group).add("kubernetes.io/cluster/" + self.cluster_name, "owned")
         self.node_group = self.create_node_group()
+        self.karpenter_controller_capacity = self.create_karpenter_controller_capacity()
         self.add_access_entry()
-        self.karpenter_chart = self.create_karpenter_chart()
         self.karpenter_node_role = self.create_karpenter_node_role_mapping()
+        self.karpenter_chart = self.create_karpenter_chart()
+        self.dns_charts = self.create_dns_cache()
+        self.metrics_server = self.create_metrics_server()
+        self.keda_chart = self.create_keda()
+        self.vpa_chart = self.create_vpa_recommender()
+        self.fluent_bit_chart = self.create_fluent_bit()
+        self.otel_collector = self.create_otel_collector()
         # self.karpenter_node_pool = self.create_karpenter_node_pool()
 
     def create_vpc(self) -> ec2.Vpc:
@@ -72,6 +110,8 @@ class CdkEksKarpenterStack(Stack):
             version=eks_alpha.KubernetesVersion.V1_32,
             kubectl_provider_options=eks_alpha.KubectlProviderOptions(
                 kubectl_layer=KubectlV32Layer(self, "kubectl"),
+                # More memory = more vCPU for the kubectl/helm Lambda
+                memory=self.kubectl_memory,
             ),
             default_capacity_type=eks_alpha.DefaultCapacityType.NODEGROUP,
             default_capacity=0,
@@ -96,6 +136,23 @@ class CdkEksKarpenterStack(Stack):
         return cluster
 
     def create_node_group(self):
+        tuning_options = {}
+        if self.node_tuning:
+            # remote_access cannot be combined with a launch template: the key goes in the template
+            launch_template = ec2.LaunchTemplate(
+                self, "DefaultNodeGroupLaunchTemplate",
+                key_pair=ec2.KeyPair.from_key_pair_name(self, "NodeKeyPair", "piercuta-key"),
+                user_data=ec2.UserData.custom(self.node_tuning.al2023_user_data())
+            )
+            tuning_options["launch_template_spec"] = eks_alpha.LaunchTemplateSpec(
+                id=launch_template.launch_template_id,
+                version=launch_template.latest_version_number
+            )
+        else:
+            tuning_options["remote_access"] = eks_alpha.NodegroupRemoteAccess(
+                ssh_key_name="piercuta-key"
+            )
+
         return self.eks_cluster.add_nodegroup_capacity(
             "DefaultNodeGroup",
             ami_type=eks_alpha.NodegroupAmiType.AL2023_X86_64_STANDARD,
@@ -111,11 +168,43 @@ class CdkEksKarpenterStack(Stack):
                 "k8s.io/cluster-autoscaler/node-template/label/karpenter.sh/capacity-type": "on-demand",
             },
             capacity_type=eks_alpha.CapacityType.ON_DEMAND,
-            remote_access=eks_alpha.NodegroupRemoteAccess(
-                ssh_key_name="piercuta-key"
-            )
+            **tuning_options
         )
 
+    def create_karpenter_controller_capacity(self):
+        """Capacity reserved to the Karpenter controller, out of workload pressure"""
+        placement = self.controller_placement
+
+        if placement.mode == "dedicated":
+            return self.eks_cluster.add_nodegroup_capacity(
+                "KarpenterControllerNodeGroup",
+                ami_type=eks_alpha.NodegroupAmiType.AL2023_X86_64_STANDARD,
+                instance_types=[ec2.InstanceType(placement.instance_type)],
+                min_size=placement.replicas,
+                desired_size=placement.replicas,
+                max_size=placement.replicas,
+                subnets=ec2.SubnetSelection(subnet_type=ec2.SubnetType.PRIVATE_WITH_EGRESS),
+                labels={CONTROLLER_NODE_LABEL: "karpenter-controller"},
+                taints=[
+                    eks_alpha.TaintSpec(
+                        effect=eks_alpha.TaintEffect.NO_SCHEDULE,
+                        key=CONTROLLER_TAINT_KEY,
+                        value="true"
+                    )
+                ],
+                capacity_type=eks_alpha.CapacityType.ON_DEMAND
+            )
+
+        if placement.mode == "fargate":
+            return self.eks_cluster.add_fargate_profile(
+                "KarpenterProfile",
+                fargate_profile_name="KarpenterProfile",
+                selectors=[eks_alpha.Selector(namespace="karpenter")],
+                subnet_selection=ec2.SubnetSelection(subnet_type=ec2.SubnetType.PRIVATE_WITH_EGRESS)
+            )
+
+        return self.node_group
+
     def add_access_entry(self):
         self.eks_cluster.grant_cluster_admin(
             id="SSOAdminRole",
@@ -135,7 +224,24 @@ class CdkEksKarpenterStack(Stack):
                 "name": "karpenter"
             }
         }
-        karpenter_namespace = self.eks_cluster.add_manifest("KarpenterNamespace", karpenter_ns)
+        # Fluent Bit's, see create_fluent_bit()
+        cloudwatch_ns = {
+            "apiVersion": "v1",
+            "kind": "Namespace",
+            "metadata": {
+                "name": "amazon-cloudwatch"
+            }
+        }
+        # Namespaces, aws-auth node mapping and the PriorityClasses of the workload tiers
+        # (used by k8s_manifests/) applied in a single kubectl invocation
+        aws_auth_mapping = self.karpenter_aws_auth_mapping()
+        karpenter_namespace = self.bootstrap_manifests = ManifestBundle(
+            self, "KarpenterBootstrapManifests",
+            cluster=self.eks_cluster,
+            manifests=[karpenter_ns, cloudwatch_ns, aws_auth_mapping, *priority_classes()],
+            # Ids of the objects before the bundle: retained for one release (manifest_bundle.py)
+            legacy_ids={"KarpenterNamespace": karpenter_ns, "KarpenterNodeRoleMapping": aws_auth_mapping}
+        )
 
         karpenter_namespace.node.add_dependency(self.node_group)
 
@@ -456,25 +562,70 @@ class CdkEksKarpenterStack(Stack):
                     #     "eks.amazonaws.com/role-arn": karpenter_sa.role.role_arn
                     # }
                 },
-                # "controller": {
-                #     "resources": {
-                #         "requests": {
-                #             "cpu": 1,
-                #             "memory": "1Gi"
-                #         },
-                #         "limits": {
-                #             "cpu": 1,
-                #             "memory": "1Gi"
-                #         }
-                #     }
-                # }
+                # replicas, Guaranteed resources, node selector / tolerations
+                **self.controller_placement.chart_values()
             }
         )
 
         karpenter_chart.node.add_dependency(karpenter_sa)
+        karpenter_chart.node.add_dependency(self.karpenter_controller_capacity)
 
         return karpenter_chart
 
+    def create_dns_cache(self):
+        dns_charts = add_dns_cache(self.eks_cluster)
+        for chart in dns_charts:
+            chart.node.add_dependency(self.node_group)
+        return dns_charts
+
+    def create_metrics_server(self):
+        # Feeds the HPA of the FastAPI deployment (k8s_manifests/fast-api.yaml)
+        metrics_server = add_metrics_server(self.eks_cluster)
+        metrics_server.node.add_dependency(self.node_group)
+        return metrics_server
+
+    def create_keda(self):
+        keda_chart = add_keda(self.eks_cluster)
+        keda_chart.node.add_dependency(self.node_group)
+        return keda_chart
+
+    def create_vpa_recommender(self):
+        # Recommendations only, read by tools/right_size.py (VPA object in k8s_manifests/fast-api-vpa.yaml)
+        if not self.right_sizing:
+            return None
+        vpa_chart = add_vpa_recommender(self.eks_cluster)
+        vpa_chart.node.add_dependency(self.node_group)
+        return vpa_chart
+
+    def create_fluent_bit(self):
+        # JSON logs of the pods to CloudWatch, batched (log_shipping.py)
+        # (namespace in the bootstrap manifests, see create_karpenter_chart())
+        fluent_bit_sa = self.eks_cluster.add_service_account(
+            "FluentBitSA",
+            name="fluent-bit",
+            namespace="amazon-cloudwatch"
+        )
+        fluent_bit_sa.role.attach_inline_policy(
+            iam.Policy(
+                self, "FluentBitPolicy",
+                document=iam.PolicyDocument.from_json(json.load(open("policy/cloudwatch-logs-policy.json")))
+            )
+        )
+        fluent_bit_sa.node.add_dependency(self.bootstrap_manifests)
+
+        fluent_bit_chart = add_fluent_bit(self.eks_cluster, region=self.region, service_account="fluent-bit")
+        fluent_bit_chart.node.add_dependency(fluent_bit_sa)
+        fluent_bit_chart.node.add_dependency(self.node_group)
+        return fluent_bit_chart
+
+    def create_otel_collector(self):
+        # Tail sampling, traces to X-Ray (otel_collector.py)
+        if not self.trace_sampling:
+            return None
+        otel_collector = add_otel_collector(self.eks_cluster, region=self.region, sampling=self.trace_sampling)
+        otel_collector.node.add_dependency(self.node_group)
+        return otel_collector
+
     def create_karpenter_node_role_mapping(self):
         """Create IAM role for Karpenter-managed nodes"""
 
@@ -508,9 +659,12 @@ class CdkEksKarpenterStack(Stack):
         #     ]
         # )
 
+        return karpenter_node_role
+
+    def karpenter_aws_auth_mapping(self) -> dict:
         # # ✅ Méthode correcte pour les nœuds EC2 when config map working on cluster
         # # Ajouter le mapping dans aws-auth via un manifest Kubernetes
-        aws_auth_mapping = {
+        return {
             "apiVersion": "v1",
             "kind": "ConfigMap",
             "metadata": {
@@ -518,14 +672,10 @@ class CdkEksKarpenterStack(Stack):
                 "namespace": "kube-system"
             },
             "data": {
-                "mapRoles": f"|-\n  - rolearn: {karpenter_node_role.role_arn}\n    username: system:node:{{{{EC2PrivateDNSName}}}}\n    groups:\n    - system:bootstrappers\n    - system:nodes"
+                "mapRoles": f"|-\n  - rolearn: {self.karpenter_node_role.role_arn}\n    username: system:node:{{{{EC2PrivateDNSName}}}}\n    groups:\n    - system:bootstrappers\n    - system:nodes"
             }
         }
 
-        self.eks_cluster.add_manifest("KarpenterNodeRoleMapping", aws_auth_mapping)
-
-        return karpenter_node_role
-
     def create_karpenter_node_pool(self):
         """Create Karpenter NodePool and EC2NodeClass from manifest files"""
 
@@ -562,9 +712,9 @@ class CdkEksKarpenterStack(Stack):
                 ]
             }
         }
-        ec2_node_class_manifest_obj = self.eks_cluster.add_manifest(
-            "KarpenterEC2NodeClass", ec2_node_class_manifest)
-        ec2_node_class_manifest_obj.node.add_dependency(self.karpenter_chart)
+        if self.node_tuning:
+            ec2_node_class_manifest["spec"]["kubelet"] = self.node_tuning.karpenter_kubelet()
+            ec2_node_class_manifest["spec"]["userData"] = self.node_tuning.al2023_user_data()
 
         node_pool_manifest = {
             "apiVersion": "karpenter.sh/v1",
@@ -603,16 +753,25 @@ class CdkEksKarpenterStack(Stack):
                                 "values": [
                                     "on-demand"
                                 ]
-                            }
+                            },
+                            *self.topology.karpenter_requirements(self.vpc.availability_zones)
                         ]
                     }
                 }
             }
         }
 
-        node_pool_manifest_obj = self.eks_cluster.add_manifest(
-            "KarpenterNodePool", node_pool_manifest)
-        node_pool_manifest_obj.node.add_dependency(ec2_node_class_manifest_obj)
+        # EC2NodeClass before NodePool, in a single kubectl invocation (CRDs come with the chart)
+        node_pool_manifests = ManifestBundle(
+            self, "KarpenterNodePoolManifests",
+            cluster=self.eks_cluster,
+            manifests=[ec2_node_class_manifest, node_pool_manifest],
+            # Ids of the objects before the bundle: retained for one release (manifest_bundle.py)
+            legacy_ids={"KarpenterEC2NodeClass": ec2_node_class_manifest, "KarpenterNodePool": node_pool_manifest}
+        )
+        node_pool_manifests.node.add_dependency(self.karpenter_chart)
+
+        return node_pool_manifests
 
     def create_load_balancer_controller_chart(self):
         aws_load_balancer_controller = eks_alpha.AlbController(
@@ -0,0 +1,51 @@
+"""Where and how big the Karpenter controller runs.
+
+The controller makes the scale-out decisions: it must not compete for CPU
+with the workloads it is provisioning capacity for. ``dedicated`` runs it on
+a small tainted node group, ``fargate`` on a Fargate profile of the
+``karpenter`` namespace, ``shared`` on the default node group.
+Requests equal limits so the controller pods are in the Guaranteed QoS class.
+"""
+from dataclasses import dataclass
+
+
+CONTROLLER_NODE_LABEL = "fastapi.piercuta.com/node-role"
+CONTROLLER_TAINT_KEY = "CriticalAddonsOnly"
+
+
+@dataclass(frozen=True)
+class KarpenterControllerPlacement:
+    mode: str = "dedicated"  # dedicated | fargate | shared
+    replicas: int = 2
+    cpu: str = "1"
+    memory: str = "1Gi"
+    # dedicated mode: one node per replica (hostname anti-affinity of the chart)
+    instance_type: str = "m5.large"
+
+    def __post_init__(self):
+        if self.mode not in ("dedicated", "fargate", "shared"):
+            raise ValueError(f"Unknown Karpenter controller placement {self.mode!r}")
+
+    def chart_values(self) -> dict:
+        """Helm values merged into the Karpenter chart values"""
+        resources = {"cpu": self.cpu, "memory": self.memory}
+        values = {
+            "replicas": self.replicas,
+            "controller": {
+                "resources": {
+                    "requests": dict(resources),
+                    "limits": dict(resources)
+                }
+            },
+            # The chart default already spreads replicas: required hostname
+            # anti-affinity and a zone topology spread constraint.
+            "priorityClassName": "system-cluster-critical",
+        }
+        if self.mode == "dedicated":
+            values["nodeSelector"] = {CONTROLLER_NODE_LABEL: "karpenter-controller"}
+            values["tolerations"] = [{
+                "key": CONTROLLER_TAINT_KEY,
+                "operator": "Exists",
+                "effect": "NoSchedule"
+            }]
+        return values
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""Benchmark the FastAPI app handlers locally (no cluster).
+
+Starts ``uvicorn app:app`` from fastapi_app/ with FASTAPI_BENCH_ENDPOINTS=1
+and drives it with keep-alive HTTP/1.1 clients (stdlib only):
+
+* io      - ``async def`` vs ``def`` endpoint doing 10 ms of I/O, with
+            ``--concurrency`` clients: the sync one is capped by the threadpool
+* cpu     - latency of the async endpoint while other clients call a
+            CPU-bound endpoint, inline vs offloaded to the process pool
+* batch   - N single calls of ``/`` vs the same items in POST /batch
+* upstream - calls to a local stub upstream (fastapi_app/stub_upstream.py)
+            through the shared pooled client vs a client per request, and
+            coalesced (single-flight) when identical requests overlap
+
+    python tools/bench_app.py --threadpool-size 40 --concurrency 200
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+
+APP_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "fastapi_app")
+BATCH_SIZE = 20
+BODIES = {
+    "POST /batch": {"requests": [{"id": str(i), "path": "/"} for i in range(BATCH_SIZE)]},
+}
+
+
+async def get(reader, writer, path: str) -> int:
+    """GET `path`, or "POST <path>" with the JSON body of BODIES"""
+    method, _, target = path.rpartition(" ")
+    if method == "POST":
+        body = json.dumps(BODIES[path]).encode()
+        writer.write(f"POST {target} HTTP/1.1\r\nHost: bench\r\nContent-Type: application/json\r\n"
+                     f"Content-Length: {len(body)}\r\n\r\n".encode() + body)
+    else:
+        writer.write(f"GET {path} HTTP/1.1\r\nHost: bench\r\n\r\n".encode())
+    await writer.drain()
+    status_line = await reader.readline()
+    length = 0
+    while (line := await reader.readline()) not in (b"\r\n", b""):
+        name, _, value = line.decode().partition(":")
+        if name.lower() == "content-length":
+            length = int(value)
+    await reader.readexactly(length)
+    return int(status_line.split()[1])
+
+
+async def client(port: int, path: str, until: float, latencies: list, errors: list):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    try:
+        while time.perf_counter() < until:
+            start = time.perf_counter()
+            status = await get(reader, writer, path)
+            if status == 200:
+                latencies.append(time.perf_counter() - start)
+            else:
+                errors.append(status)
+    finally:
+        writer.close()
+
+
+async def load(port: int, mix: dict, duration: float) -> dict:
+    """Run `mix` (path -> clients) for `duration`, results per path"""
+    until = time.perf_counter() + duration
+    results = {path: ([], []) for path in mix}
+    await asyncio.gather(*(
+        client(port, path, until, *results[path])
+        for path, clients in mix.items()
+        for _ in range(clients)
+    ))
+    return results
+
+
+def report(name: str, path: str, latencies: list, errors: list, duration: float):
+    if len(latencies) < 2:
+        print(f"{name:>15} {path:<28} {len(latencies)} successful request, {len(errors)} errors")
+        return
+    items = BATCH_SIZE if path == "POST /batch" else 1
+    quantiles = statistics.quantiles(latencies, n=100)
+    print(f"{name:>15} {path:<28} {len(latencies) / duration:8.0f} req/s {len(latencies) * items / duration:8.0f} items/s  "
+          f"p50 {quantiles[49] * 1000:7.1f} ms  p99 {quantiles[98] * 1000:7.1f} ms  {len(errors)} rejected")
+
+
+def start_server(module: str, port: int, env: dict = None) -> subprocess.Popen:
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", f"{module}:app", "--port", str(port), "--log-level", "warning"],
+        cwd=APP_DIR, env={**os.environ, **(env or {})}
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--threadpool-size", type=int, default=40)
+    parser.add_argument("--process-pool-size", type=int, default=1)
+    parser.add_argument("--cpu-clients", type=int, default=4)
+    args = parser.parse_args()
+
+    env = {
+        "FASTAPI_BENCH_ENDPOINTS": "1",
+        "FASTAPI_THREADPOOL_SIZE": str(args.threadpool_size),
+        "FASTAPI_PROCESS_POOL_SIZE": str(args.process_pool_size),
+        # Measure the handlers, not the load shedding
+        "FASTAPI_MAX_CONCURRENCY": str(args.concurrency * 2),
+    }
+    upstream_port = args.port + 1
+    env["FASTAPI_UPSTREAMS"] = f"stub=http://127.0.0.1:{upstream_port}"
+    stub = start_server("stub_upstream", upstream_port)
+    server = start_server("app", args.port, env)
+    try:
+        time.sleep(2)
+        probes = max(1, args.concurrency // 10)
+        scenarios = [
+            ("io async", {"/bench/async": args.concurrency}),
+            ("io sync", {"/bench/sync": args.concurrency}),
+            ("cpu inline", {"/bench/cpu/inline": args.cpu_clients, "/bench/async": probes}),
+            ("cpu offload", {"/bench/cpu/offload": args.cpu_clients, "/bench/async": probes}),
+            ("upstream pooled", {"/bench/upstream/pooled": args.concurrency}),
+            ("upstream new", {"/bench/upstream/per-request": args.concurrency}),
+            ("upstream single", {"/bench/upstream/coalesced": args.concurrency}),
+            ("single calls", {"/": args.concurrency}),
+            (f"batch of {BATCH_SIZE}", {"POST /batch": max(1, args.concurrency // BATCH_SIZE)}),
+        ]
+        print(f"threadpool {args.threadpool_size}, process pool {args.process_pool_size}, "
+              f"{args.concurrency} clients, {args.duration:g}s per scenario")
+        for name, mix in scenarios:
+            results = asyncio.run(load(args.port, mix, args.duration))
+            for path, (latencies, errors) in results.items():
+                report(name, path, latencies, errors, args.duration)
+    finally:
+        for process in (server, stub):
+            process.terminate()
+            process.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""Peak memory of the app serving large payloads: streamed vs buffered.
+
+For each payload size, starts a fresh ``uvicorn app:app`` (Linux: reads the
+peak RSS, VmHWM, from /proc), downloads the export once and reports the peak
+RSS of the server and the payload size. The streamed exports stay flat, the
+buffered one grows with the payload:
+
+    python tools/bench_stream_memory.py --rows 10000 100000 1000000
+"""
+import argparse
+import time
+import urllib.request
+
+from bench_app import start_server
+
+
+VARIANTS = {
+    "ndjson": "/bench/export?format=ndjson&rows={rows}",
+    "csv": "/bench/export?format=csv&rows={rows}",
+    "buffered": "/bench/export/buffered?rows={rows}",
+}
+
+
+def peak_rss_mib(pid: int) -> float:
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) / 1024
+    raise RuntimeError("VmHWM not found")
+
+
+def download(url: str) -> int:
+    size = 0
+    with urllib.request.urlopen(url) as response:
+        while chunk := response.read(64 * 1024):
+            size += len(chunk)
+    return size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8097)
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--variants", nargs="+", choices=VARIANTS, default=list(VARIANTS))
+    args = parser.parse_args()
+
+    print(f"{'variant':>9} {'rows':>9} {'payload MiB':>12} {'idle RSS MiB':>13} {'peak RSS MiB':>13}")
+    for variant in args.variants:
+        for rows in args.rows:
+            server = start_server("app", args.port, {"FASTAPI_BENCH_ENDPOINTS": "1", "FASTAPI_PROCESS_POOL_SIZE": "0"})
+            try:
+                time.sleep(2)
+                idle = peak_rss_mib(server.pid)
+                size = download(f"http://127.0.0.1:{args.port}" + VARIANTS[variant].format(rows=rows))
+                peak = peak_rss_mib(server.pid)
+            finally:
+                server.terminate()
+                server.wait()
+            print(f"{variant:>9} {rows:>9} {size / 2 ** 20:12.1f} {idle:13.1f} {peak:13.1f}")
+
+
+if __name__ == "__main__":
+    main()
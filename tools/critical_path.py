@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""Print the critical path of a synthesized stack.
+
+Reads a CloudFormation template from ``cdk synth`` (``cdk.out/<Stack>.template.json``),
+builds the resource dependency graph (``DependsOn``, ``Ref``, ``Fn::GetAtt``,
+``Fn::Sub``) and prints the longest chain, i.e. the lower bound of the stack
+creation time however parallel CloudFormation is.
+
+Durations are estimates per resource type; pass the stack events of a real
+deployment to use measured ones:
+
+    aws cloudformation describe-stack-events --stack-name EksClassicClusterStack > events.json
+    python tools/critical_path.py cdk.out/EksClassicClusterStack.template.json --events events.json
+"""
+import argparse
+from datetime import datetime
+import json
+import re
+
+
+# Rough creation times in seconds, kubectl custom resources go through a Lambda
+ESTIMATED_SECONDS = {
+    "Custom::AWSCDK-EKS-Cluster": 600,
+    "AWS::EKS::Cluster": 600,
+    "AWS::EKS::Nodegroup": 180,
+    "Custom::AWSCDK-EKS-FargateProfile": 120,
+    "AWS::EKS::FargateProfile": 120,
+    "Custom::AWSCDK-EKS-HelmChart": 90,
+    "Custom::AWSCDK-EKS-KubernetesResource": 20,
+    "Custom::AWSCDK-EKS-KubernetesPatch": 20,
+    "Custom::AWSCDK-EKS-KubernetesObjectValue": 60,
+    "AWS::CloudFormation::Stack": 90,
+    "AWS::CloudFront::Distribution": 300,
+    "AWS::EC2::NatGateway": 100,
+    "AWS::EC2::VPC": 15,
+    "AWS::IAM::Role": 15,
+    "AWS::Lambda::Function": 10,
+}
+DEFAULT_SECONDS = 5
+
+SUB_REFERENCE = re.compile(r"\$\{([A-Za-z0-9]+)(?:\.[A-Za-z0-9.]+)?\}")
+
+
+def references(value, resources: dict) -> set:
+    """Logical ids referenced by intrinsic functions inside `value`"""
+    found = set()
+    if isinstance(value, dict):
+        for key, item in value.items():
+            if key == "Ref" and isinstance(item, str):
+                found.add(item)
+            elif key == "Fn::GetAtt":
+                found.add(item[0] if isinstance(item, list) else item.split(".")[0])
+            elif key == "Fn::Sub":
+                template = item[0] if isinstance(item, list) else item
+                found.update(SUB_REFERENCE.findall(template))
+                if isinstance(item, list):
+                    found |= references(item[1], resources)
+            else:
+                found |= references(item, resources)
+    elif isinstance(value, list):
+        for item in value:
+            found |= references(item, resources)
+    return found & resources.keys()
+
+
+def dependency_graph(template: dict) -> dict:
+    resources = template.get("Resources", {})
+    graph = {}
+    for logical_id, resource in resources.items():
+        depends_on = resource.get("DependsOn", [])
+        if isinstance(depends_on, str):
+            depends_on = [depends_on]
+        graph[logical_id] = (set(depends_on) | references(resource.get("Properties", {}), resources)) - {logical_id}
+    return graph
+
+
+def measured_seconds(events: list) -> dict:
+    """Creation time per logical id from `describe-stack-events` output"""
+    started, completed = {}, {}
+    for event in events:
+        logical_id = event["LogicalResourceId"]
+        timestamp = datetime.fromisoformat(event["Timestamp"].replace("Z", "+00:00"))
+        if event["ResourceStatus"] == "CREATE_IN_PROGRESS":
+            started[logical_id] = min(timestamp, started.get(logical_id, timestamp))
+        elif event["ResourceStatus"] == "CREATE_COMPLETE":
+            completed[logical_id] = timestamp
+    return {
+        logical_id: (completed[logical_id] - started[logical_id]).total_seconds()
+        for logical_id in completed.keys() & started.keys()
+    }
+
+
+def critical_path(graph: dict, durations: dict) -> tuple:
+    """Longest weighted path of the DAG: (total seconds, [logical ids])"""
+    finish, previous = {}, {}
+
+    def visit(node, stack=()):
+        if node in finish:
+            return finish[node]
+        if node in stack:
+            raise ValueError(f"Dependency cycle through {node}")
+        start = 0
+        for dependency in graph[node]:
+            end = visit(dependency, stack + (node,))
+            if end > start:
+                start, previous[node] = end, dependency
+        finish[node] = start + durations[node]
+        return finish[node]
+
+    last = max(graph, key=visit)
+    path = [last]
+    while path[-1] in previous:
+        path.append(previous[path[-1]])
+    return finish[last], path[::-1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("template", help="synthesized template (cdk.out/<Stack>.template.json)")
+    parser.add_argument("--events", help="JSON output of `aws cloudformation describe-stack-events`")
+    args = parser.parse_args()
+
+    with open(args.template) as f:
+        template = json.load(f)
+    resources = template.get("Resources", {})
+    graph = dependency_graph(template)
+
+    durations = {
+        logical_id: ESTIMATED_SECONDS.get(resource["Type"], DEFAULT_SECONDS)
+        for logical_id, resource in resources.items()
+    }
+    if args.events:
+        with open(args.events) as f:
+            durations.update(measured_seconds(json.load(f)["StackEvents"]))
+
+    total, path = critical_path(graph, durations)
+    elapsed = 0
+    print(f"{'at':>7}  {'takes':>6}  resource")
+    for logical_id in path:
+        print(f"{elapsed:>6.0f}s  {durations[logical_id]:>5.0f}s  {logical_id} ({resources[logical_id]['Type']})")
+        elapsed += durations[logical_id]
+    print(f"\ncritical path: {total:.0f}s, serial sum: {sum(durations.values()):.0f}s, {len(resources)} resources")
+
+
+if __name__ == "__main__":
+    main()
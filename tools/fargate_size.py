@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""Benchmark the FastAPI deployment on Fargate tiers and pick the cheapest per request.
+
+``bench`` resizes the deployment to each tier (kubectl, current kube
+context), waits for the rollout, runs an in-cluster load generator against
+the service and appends ``vcpu,memory_gb,rps,p99_ms`` to a CSV. ``pick``
+ranks the recorded runs by requests per second per dollar-hour:
+
+    python tools/fargate_size.py bench --tiers 0.25:1 0.5:1 1:2 -o fargate-bench.csv
+    python tools/fargate_size.py pick fargate-bench.csv --max-p99-ms 200
+
+The winner goes in ``EksFargateFastApiServiceStack(pod_size=FargateTier(...))``.
+"""
+import argparse
+import csv
+import json
+import os
+import re
+import subprocess
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from my_fastapi_eks.fargate.fargate_sizing import FargateTier, best_tier  # noqa: E402
+
+
+LOADGEN_IMAGE = "williamyeh/hey:latest"
+
+
+def kubectl(*args) -> str:
+    return subprocess.run(["kubectl", *args], check=True, capture_output=True, text=True).stdout
+
+
+def parse_tier(value: str) -> FargateTier:
+    vcpu, memory_gb = value.split(":")
+    return FargateTier(float(vcpu), float(memory_gb))
+
+
+def bench(args):
+    with open(args.output, "a", newline="") as f:
+        writer = csv.writer(f)
+        for tier in args.tiers:
+            resources = tier.resources()
+            requests = ",".join(f"{k}={v}" for k, v in resources["requests"].items())
+            limits = ",".join(f"{k}={v}" for k, v in resources["limits"].items())
+            kubectl("set", "resources", f"deployment/{args.deployment}", "-n", args.namespace,
+                    f"--requests={requests}", f"--limits={limits}")
+            kubectl("rollout", "status", f"deployment/{args.deployment}", "-n", args.namespace, "--timeout=600s")
+
+            pod = "fargate-size-loadgen"
+            kubectl(
+                "run", pod, "-n", args.namespace, "--restart=Never", f"--image={LOADGEN_IMAGE}", "--",
+                "-z", f"{args.duration}s", "-c", str(args.concurrency), args.url
+            )
+            try:
+                kubectl("wait", f"pod/{pod}", "-n", args.namespace, "--for=jsonpath={.status.phase}=Succeeded",
+                        f"--timeout={args.duration + 300}s")
+                report = kubectl("logs", pod, "-n", args.namespace)
+            finally:
+                kubectl("delete", "pod", pod, "-n", args.namespace, "--wait=false")
+
+            rps = float(re.search(r"Requests/sec:\s+([\d.]+)", report).group(1))
+            p99_ms = float(re.search(r"99%+ in ([\d.]+) secs", report).group(1)) * 1000
+            writer.writerow([tier.vcpu, tier.memory_gb, rps, p99_ms])
+            f.flush()
+            print(f"{tier}: {rps:.0f} req/s, p99 {p99_ms:.0f} ms", file=sys.stderr)
+
+
+def pick(args):
+    with open(args.benchmarks) as f:
+        runs = [
+            (FargateTier(float(row[0]), float(row[1])), float(row[2]), float(row[3]))
+            for row in csv.reader(f)
+            if row and not row[0].startswith("vcpu")
+        ]
+
+    for tier, rps, p99_ms in sorted(runs, key=lambda run: run[1] / run[0].hourly_cost, reverse=True):
+        print(f"{str(tier):>18}  ${tier.hourly_cost:.4f}/h  {rps:8.0f} req/s  p99 {p99_ms:6.0f} ms  "
+              f"{rps / tier.hourly_cost:10.0f} req/s per $/h")
+
+    tier, _ = best_tier(runs, args.max_p99_ms)
+    print(f"\npod_size=FargateTier(vcpu={tier.vcpu:g}, memory_gb={tier.memory_gb:g})")
+    print(json.dumps(tier.resources(), indent=2))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(required=True)
+
+    bench_parser = subparsers.add_parser("bench")
+    bench_parser.add_argument("--tiers", nargs="+", type=parse_tier, required=True, help="vcpu:memory_gb")
+    bench_parser.add_argument("--namespace", default="fastapi")
+    bench_parser.add_argument("--deployment", default="fastapi-app")
+    bench_parser.add_argument("--url", default="http://fastapi-service/")
+    bench_parser.add_argument("--concurrency", type=int, default=50)
+    bench_parser.add_argument("--duration", type=int, default=120, help="seconds of load per tier")
+    bench_parser.add_argument("-o", "--output", default="fargate-bench.csv")
+    bench_parser.set_defaults(func=bench)
+
+    pick_parser = subparsers.add_parser("pick")
+    pick_parser.add_argument("benchmarks", help="CSV written by `bench`")
+    pick_parser.add_argument("--max-p99-ms", type=float, help="ignore runs above this latency")
+    pick_parser.set_defaults(func=pick)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
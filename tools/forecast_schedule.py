@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""Turn recorded traffic into KEDA pre-scaling windows.
+
+Input is a CSV of ``timestamp,requests_per_second`` (e.g. the ALB RequestCount
+metric exported from CloudWatch, divided by the period), with timestamps in
+the timezone the windows will be evaluated in. Output is the JSON read by
+``PreScaling.from_forecast``:
+
+    python tools/forecast_schedule.py alb-requests.csv --requests-per-pod 80 -o prescaling.json
+"""
+import argparse
+import csv
+from dataclasses import asdict
+from datetime import datetime
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from my_fastapi_eks.common.prescaling import forecast_windows  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("samples", help="CSV file: timestamp,requests_per_second")
+    parser.add_argument("--requests-per-pod", type=float, required=True,
+                        help="sustainable requests per second of one pod at the HPA CPU target")
+    parser.add_argument("--lead-minutes", type=int, default=10, help="node launch + image pull + startup")
+    parser.add_argument("--quantile", type=float, default=0.9)
+    parser.add_argument("--baseline-replicas", type=int, default=1, help="minReplicas of the HPA")
+    parser.add_argument("-o", "--output", default="-")
+    args = parser.parse_args()
+
+    with open(args.samples) as f:
+        samples = [
+            (datetime.fromisoformat(row[0]), float(row[1]))
+            for row in csv.reader(f)
+            if row and not row[0].startswith("timestamp")
+        ]
+
+    windows = forecast_windows(
+        samples,
+        requests_per_pod=args.requests_per_pod,
+        lead_minutes=args.lead_minutes,
+        quantile=args.quantile,
+        baseline_replicas=args.baseline_replicas
+    )
+    output = json.dumps([asdict(window) for window in windows], indent=2)
+    if args.output == "-":
+        print(output)
+    else:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    print(f"{len(windows)} windows, peak floor {max((w.min_replicas for w in windows), default=0)} replicas",
+          file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""Propose pod requests and limits from the VPA recommendations.
+
+Reads the recommendation-only VerticalPodAutoscalers and the Deployments they
+target (kubectl, current kube context, or ``kubectl get ... -o json`` dumps)
+and prints, per container, the current and proposed ``resources``. The
+proposal is meant to be copied into the deployment dict of the service stack:
+
+    python tools/right_size.py --namespace fastapi
+    python tools/right_size.py --vpa vpa.json --deployments deployments.json
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from my_fastapi_eks.common.right_sizing import propose_resources  # noqa: E402
+
+
+def load(path: str | None, kind: str, namespace: str | None) -> list:
+    if path:
+        with open(path) as f:
+            return json.load(f)["items"]
+    scope = ["-n", namespace] if namespace else ["-A"]
+    output = subprocess.run(["kubectl", "get", kind, *scope, "-o", "json"],
+                            check=True, capture_output=True, text=True).stdout
+    return json.loads(output)["items"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--namespace", help="default: all namespaces")
+    parser.add_argument("--vpa", help="dump of `kubectl get vpa -o json` instead of the live cluster")
+    parser.add_argument("--deployments", help="dump of `kubectl get deployments -o json`")
+    parser.add_argument("--memory-limit-headroom", type=float, default=1.25,
+                        help="memory limit as a multiple of the request, when above the VPA upper bound")
+    args = parser.parse_args()
+
+    deployments = {
+        (deployment["metadata"]["namespace"], deployment["metadata"]["name"]): deployment
+        for deployment in load(args.deployments, "deployments", args.namespace)
+    }
+
+    proposals = {}
+    for vpa in load(args.vpa, "verticalpodautoscalers", args.namespace):
+        namespace = vpa["metadata"]["namespace"]
+        target = vpa["spec"]["targetRef"]["name"]
+        recommendations = vpa.get("status", {}).get("recommendation", {}).get("containerRecommendations", [])
+        if not recommendations:
+            print(f"{namespace}/{target}: no recommendation yet", file=sys.stderr)
+            continue
+
+        containers = {}
+        deployment = deployments.get((namespace, target))
+        if deployment:
+            containers = {
+                container["name"]: container.get("resources", {})
+                for container in deployment["spec"]["template"]["spec"]["containers"]
+            }
+
+        for recommendation in recommendations:
+            name = recommendation["containerName"]
+            current = containers.get(name, {})
+            proposed = propose_resources(recommendation, current, args.memory_limit_headroom)
+            proposals[f"{namespace}/{target}/{name}"] = proposed
+            print(f"{namespace}/{target}/{name}", file=sys.stderr)
+            print(f"  current:  {json.dumps(current)}", file=sys.stderr)
+            print(f"  proposed: {json.dumps(proposed)}", file=sys.stderr)
+
+    print(json.dumps(proposals, indent=2))
+
+
+if __name__ == "__main__":
+    main()
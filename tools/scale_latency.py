@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""Measure "load spike -> new pod Ready" latency of a cluster flavour.
+
+Starts an in-cluster load generator against the FastAPI service, then polls
+the HPA and the pods (kubectl, current kube context) and reports, from the
+start of the spike:
+
+* hpa      - the HPA raises desiredReplicas (metrics-server resolution + HPA sync)
+* created  - the first new pod exists (Deployment controller)
+* scheduled - it is bound to a node (Karpenter / Fargate provisioning)
+* ready    - it passes its readiness probe (image pull + app startup)
+
+    python tools/scale_latency.py --flavour karpenter --namespace fastapi --hpa fastapi-hpa
+"""
+import argparse
+from datetime import datetime, timezone
+import json
+import subprocess
+import time
+
+
+LOADGEN_IMAGE = "williamyeh/hey:latest"
+
+
+def kubectl(*args) -> str:
+    return subprocess.run(["kubectl", *args], check=True, capture_output=True, text=True).stdout
+
+
+def kubectl_json(*args) -> dict:
+    return json.loads(kubectl(*args, "-o", "json"))
+
+
+def parse_time(value: str) -> datetime:
+    return datetime.fromisoformat(value.replace("Z", "+00:00"))
+
+
+def condition_time(pod: dict, condition_type: str) -> datetime | None:
+    for condition in pod["status"].get("conditions", []):
+        if condition["type"] == condition_type and condition["status"] == "True":
+            return parse_time(condition["lastTransitionTime"])
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--flavour", required=True, help="label of the run (classic, fargate, karpenter)")
+    parser.add_argument("--namespace", default="fastapi")
+    parser.add_argument("--hpa", default="fastapi-hpa")
+    parser.add_argument("--selector", default="app=fastapi")
+    parser.add_argument("--url", default="http://fastapi-service/")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--timeout", type=int, default=900, help="seconds to wait for a new Ready pod")
+    args = parser.parse_args()
+
+    initial_pods = {pod["metadata"]["name"] for pod in kubectl_json(
+        "get", "pods", "-n", args.namespace, "-l", args.selector)["items"]}
+    initial_desired = kubectl_json("get", "hpa", args.hpa, "-n", args.namespace)["status"]["desiredReplicas"]
+
+    spike = datetime.now(timezone.utc)
+    kubectl(
+        "run", "scale-latency-loadgen", "-n", args.namespace, "--restart=Never",
+        f"--image={LOADGEN_IMAGE}", "--",
+        "-z", f"{args.timeout}s", "-c", str(args.concurrency), args.url
+    )
+
+    events = {}
+    try:
+        while "ready" not in events:
+            elapsed = (datetime.now(timezone.utc) - spike).total_seconds()
+            if elapsed > args.timeout:
+                raise SystemExit(f"No new Ready pod after {args.timeout}s: {events}")
+
+            hpa = kubectl_json("get", "hpa", args.hpa, "-n", args.namespace)
+            if "hpa" not in events and hpa["status"]["desiredReplicas"] > initial_desired:
+                events["hpa"] = datetime.now(timezone.utc)
+
+            new_pods = [
+                pod for pod in kubectl_json("get", "pods", "-n", args.namespace, "-l", args.selector)["items"]
+                if pod["metadata"]["name"] not in initial_pods
+            ]
+            for pod in new_pods:
+                timestamps = {
+                    "created": parse_time(pod["metadata"]["creationTimestamp"]),
+                    "scheduled": condition_time(pod, "PodScheduled"),
+                    "ready": condition_time(pod, "Ready"),
+                }
+                for phase, timestamp in timestamps.items():
+                    if timestamp and (phase not in events or timestamp < events[phase]):
+                        events[phase] = timestamp
+            time.sleep(1)
+    finally:
+        kubectl("delete", "pod", "scale-latency-loadgen", "-n", args.namespace, "--wait=false")
+
+    print(f"flavour: {args.flavour}")
+    for phase in ("hpa", "created", "scheduled", "ready"):
+        if phase in events:
+            print(f"  {phase:>9}: +{(events[phase] - spike).total_seconds():.0f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""Import time and time-to-first-response of the app, per docs mode.
+
+A scale-out pod is useless until it answers its readiness probe. For each
+FASTAPI_DOCS_MODE this reports:
+
+* import   - ``python -X importtime -c "import app"``: total and the
+             heaviest modules (cumulative)
+* health   - process start -> first 200 on /health (uvicorn + import + lifespan)
+* openapi  - then the first /openapi.json (built on demand in live mode)
+
+    python tools/startup_report.py --modes live static off
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+
+from bench_app import APP_DIR, start_server
+
+
+def import_times(env: dict) -> list:
+    """[(cumulative µs, module)] sorted, heaviest first"""
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app"],
+        cwd=APP_DIR, env={**os.environ, **env}, capture_output=True, text=True, check=True
+    ).stderr
+    times = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, module = line.removeprefix("import time:").split("|")
+        times.append((int(cumulative), module.rstrip()))
+    return sorted(times, reverse=True)
+
+
+def first_response(url: str, timeout: float = 30) -> float:
+    start = time.perf_counter()
+    while time.perf_counter() - start < timeout:
+        try:
+            with urllib.request.urlopen(url) as response:
+                response.read()
+                return time.perf_counter()
+        except (urllib.error.URLError, ConnectionError):
+            time.sleep(0.005)
+    raise TimeoutError(url)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8096)
+    parser.add_argument("--modes", nargs="+", choices=["live", "static", "off"], default=["live", "static", "off"])
+    parser.add_argument("--top", type=int, default=8, help="heaviest imports to list")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        openapi_file = os.path.join(tmp, "openapi.json")
+        subprocess.run([sys.executable, "export_openapi.py", openapi_file], cwd=APP_DIR, check=True)
+
+        for mode in args.modes:
+            env = {"FASTAPI_DOCS_MODE": mode, "FASTAPI_OPENAPI_FILE": openapi_file}
+            times = import_times(env)
+            app_total = next(cumulative for cumulative, module in times if module.strip() == "app")
+            print(f"[{mode}] import app: {app_total / 1000:.0f} ms")
+            for cumulative, module in times[1:args.top + 1]:
+                print(f"    {cumulative / 1000:7.1f} ms  {module}")
+
+            start = time.perf_counter()
+            server = start_server("app", args.port, env)
+            try:
+                ready = first_response(f"http://127.0.0.1:{args.port}/health")
+                print(f"[{mode}] process start -> first /health: {(ready - start) * 1000:.0f} ms")
+                if mode != "off":
+                    before = time.perf_counter()
+                    done = first_response(f"http://127.0.0.1:{args.port}/openapi.json")
+                    print(f"[{mode}] first /openapi.json: {(done - before) * 1000:.1f} ms")
+            finally:
+                server.terminate()
+                server.wait()
+
+
+if __name__ == "__main__":
+    main()